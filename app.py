@@ -1,149 +1,935 @@
-from flask import Flask, render_template, request, jsonify, send_file
-import base64
+from flask import Flask, Request, render_template, request, jsonify, send_file, g, url_for
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+import contextlib
+import functools
+import hashlib
 import io
-import jieba
-from wordcloud import WordCloud
-from collections import Counter
-import re
-import string
+import os
+import uuid
+from text_analysis import (
+    DocumentCounts, build_stopwords, count_stream, count_tokens, filter_counts,
+    iter_file_chunks, warm_up
+)
+from result_cache import DocumentStore, ResultCache, image_digest, make_key, text_digest
+from session_store import create_blob_store, create_session_store
+from jobs import AdmissionGate, JobQueue, QueueFullError, error_message
+from freq_store import FrequencyStore
+from keyness import DEFAULT_METHOD, compare
+from masks import mask_path, save_mask
+from metrics import finish_timings, record_size, render_metrics, start_timings, timed
+from wordcloud_render import (
+    MAX_PANELS, OUTPUT_FORMATS, RENDER_PARAMS, canvas_params, check_output, encode_wordcloud, from_layout, preview_params, render_contrast, render_side_by_side, save_scale,
+    render_wordcloud, top_words as get_top_words
+)
+
+# 请求体大小上限（字节）：文件上传接口与其他接口（JSON 文本、遮罩图片等）分别配置，
+# 超出时不读取请求体，直接返回 413
+MAX_UPLOAD_BYTES = int(os.environ.get('WORDCLOUD_MAX_UPLOAD_BYTES', 200 * 1024 * 1024))
+MAX_BODY_BYTES = int(os.environ.get('WORDCLOUD_MAX_BODY_BYTES', 16 * 1024 * 1024))
+
+# 以请求体流式上传文件的接口
+UPLOAD_ENDPOINTS = {'upload', 'ingest_document'}
+
+
+class WordCloudRequest(Request):
+    """按接口区分请求体大小上限；没有 Content-Length 的分块请求读取时超出上限同样返回 413"""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint in UPLOAD_ENDPOINTS and not self.is_json:
+            return MAX_UPLOAD_BYTES
+        return MAX_BODY_BYTES
+
 
 app = Flask(__name__)
+app.request_class = WordCloudRequest
+
+# 在后台加载 jieba 词典，第一次生成词云时无需等待词典构建
+warm_up()
+
+# 保存会话ID的Cookie名称
+SESSION_COOKIE = 'wordcloud_sid'
+
+# 每个会话保留的最近词云图像数量
+MAX_SESSION_IMAGES = 4
+
+# 词云图像的浏览器/代理缓存时间（秒）；图像ID即内容哈希，内容不会变化
+IMAGE_MAX_AGE = 86400
+
+# 会话状态存储（自定义停用词与当前词云图像按会话隔离），通过环境变量
+# WORDCLOUD_SESSION_STORE 选择，多进程部署时使用 sqlite:///路径 共享
+session_store = create_session_store()
+
+# 词云图像存储：图像ID -> {data, output, layout, params, preview}，其他格式与尺寸的编码结果以
+# “图像ID/格式/预设/倍数”为键另行保存。按字节预算淘汰，预算可通过环境变量
+# WORDCLOUD_IMAGE_BYTES 配置；与会话存储位置相同，sqlite 会话存储时多个进程共享
+image_store = create_blob_store('images', int(os.environ.get('WORDCLOUD_IMAGE_BYTES', 256 * 1024 * 1024)))
+
+# 估计图像存储中每个布局项（词语、字号、位置、方向、颜色）占用的字节数
+LAYOUT_ITEM_BYTES = 200
+
+# 词云结果缓存，容量可通过环境变量 WORDCLOUD_CACHE_BYTES 配置
+result_cache = ResultCache(int(os.environ.get('WORDCLOUD_CACHE_BYTES', 64 * 1024 * 1024)))
+
+# 各会话最近文档的未过滤词频，停用词变化时据此增量重绘而无需重新分词；
+# 以 (会话ID, 文档ID) 为键，其他工作进程上没有时前端会回退为完整生成
+documents = DocumentStore(int(os.environ.get('WORDCLOUD_MAX_DOCUMENTS', 64)))
+
+# 文本长度（字符数）达到该阈值时 /generate 转为后台任务，返回任务ID供查询进度
+ASYNC_THRESHOLD = int(os.environ.get('WORDCLOUD_ASYNC_THRESHOLD', 200_000))
+
+# 后台任务队列：并发数与等待上限分别由 WORDCLOUD_JOB_WORKERS、WORDCLOUD_MAX_JOBS 配置；
+# 任务状态同步到与会话存储位置相同的存储，多进程部署时任一进程都能查询任务进度
+job_queue = JobQueue(
+    int(os.environ.get('WORDCLOUD_JOB_WORKERS', 2)),
+    int(os.environ.get('WORDCLOUD_MAX_JOBS', 16)),
+    create_blob_store('jobs', 4 * 1024 * 1024)
+)
+
+# 设置环境变量 WORDCLOUD_TIMING_HEADER=1 时在响应头 X-Timing 中返回各阶段耗时
+TIMING_HEADER = os.environ.get('WORDCLOUD_TIMING_HEADER', '') not in ('', '0')
+
+# 准入控制：请求线程中同时执行的重计算（分词、布局、编码）数量有上限，排队已满或
+# 等待超时时返回 503。请求体达到 LARGE_REQUEST_BYTES 的大请求单独限制并发，
+# 少数超大文本不会占满普通请求的名额
+LARGE_REQUEST_BYTES = int(os.environ.get('WORDCLOUD_LARGE_REQUEST_BYTES', 1024 * 1024))
+ADMIT_TIMEOUT = float(os.environ.get('WORDCLOUD_ADMIT_TIMEOUT', 10))
+request_gate = AdmissionGate(
+    int(os.environ.get('WORDCLOUD_MAX_ACTIVE', 4)),
+    int(os.environ.get('WORDCLOUD_MAX_WAITING', 16)),
+    ADMIT_TIMEOUT
+)
+large_request_gate = AdmissionGate(
+    int(os.environ.get('WORDCLOUD_MAX_LARGE_ACTIVE', 1)),
+    int(os.environ.get('WORDCLOUD_MAX_LARGE_WAITING', 2)),
+    ADMIT_TIMEOUT
+)
+
+# 返回 503 时建议客户端重试的等待时间（秒）
+RETRY_AFTER = 5
+
+# /compare 一次最多对比的文档数，可通过环境变量 WORDCLOUD_MAX_COMPARE 配置
+MAX_COMPARE_DOCUMENTS = int(os.environ.get('WORDCLOUD_MAX_COMPARE', 500))
+
+# 多文档对比时每篇文档返回的关键词数上限
+MAX_COMPARE_TOP = 200
+
+# 语料高频词接口一次最多返回的词语数
+MAX_CORPUS_TOP = 1000
+
+# 语料词频库（按语料与日期累加的词频），数据库路径由环境变量 WORDCLOUD_FREQ_STORE 配置
+freq_store = FrequencyStore()
+
+def get_session():
+    """返回当前请求的会话状态（只读），必要时分配新的会话ID"""
+    if 'session_state' not in g:
+        sid = request.cookies.get(SESSION_COOKIE, '')
+        if len(sid) != 32 or not all(c in '0123456789abcdef' for c in sid):
+            sid = uuid.uuid4().hex
+            g.new_sid = True
+        g.sid = sid
+        g.session_state = session_store.load(sid)
+    return g.session_state
+
+def update_session(mutate):
+    """原子地修改当前请求的会话状态：mutate(状态) 在会话存储的锁或写事务中执行"""
+    get_session()
+    g.session_state = session_store.update(g.sid, mutate)
+    return g.session_state
+
+def add_image(state, image_id):
+    """把图像加入会话最近的图像列表（最多 MAX_SESSION_IMAGES 个）并设为当前图像"""
+    images = [i for i in state['images'] if i != image_id]
+    images.append(image_id)
+    state['images'] = images[-MAX_SESSION_IMAGES:]
+    state['image_id'] = image_id
+
+def replace_image(state, image_id, replaces):
+    """后台任务完成时把结果加入会话
+
+    只有当前图像仍是提交任务时的 replaces（预览或之前的词云）时才设为当前图像，
+    期间已生成了其他词云时只加入最近的图像列表。
+    """
+    current = state['image_id']
+    add_image(state, image_id)
+    if current != replaces:
+        state['image_id'] = current
+
+def session_image(image_id):
+    """返回属于当前会话的图像，不存在或已被淘汰时返回 None"""
+    if image_id is None or image_id not in get_session()['images']:
+        return None
+    return image_store.get(image_id)
+
+@app.after_request
+def set_session_cookie(response):
+    if g.get('new_sid'):
+        response.set_cookie(SESSION_COOKIE, g.sid, httponly=True, samesite='Lax')
+    return response
+
+@app.before_request
+def check_request_size():
+    """请求体声明的长度超过上限时立即拒绝，不读取请求体，也不进入准入队列"""
+    limit = request.max_content_length
+    if limit is not None and (request.content_length or 0) > limit:
+        raise RequestEntityTooLarge()
+
+@app.before_request
+def start_request_timings():
+    start_timings()
+
+@app.after_request
+def add_timing_header(response):
+    """记录请求总耗时，按配置在 X-Timing 响应头中返回各阶段耗时"""
+    timings = finish_timings()
+    if timings is not None and TIMING_HEADER:
+        response.headers['X-Timing'] = timings.header()
+    return response
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    limit = request.max_content_length // 1024 // 1024
+    if request.endpoint in UPLOAD_ENDPOINTS:
+        message = f'文件过大，上限为 {limit}MB'
+    else:
+        message = f'请求内容过大，上限为 {limit}MB，大文本请使用导入文件'
+    return jsonify({'success': False, 'message': message}), 413
+
+@app.errorhandler(QueueFullError)
+def server_busy(e):
+    response = jsonify({'success': False, 'message': '服务器繁忙，请稍后再试'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(RETRY_AFTER)
+    return response
+
+@app.errorhandler(HTTPException)
+def http_error(e):
+    return jsonify({'success': False, 'message': e.description}), e.code
+
+def error_response(e):
+    """把视图中捕获的异常转换为 JSON 错误响应
+
+    HTTP 错误与服务器繁忙交给对应的错误处理函数；参数错误（ValueError）返回
+    错误原因，其他异常只记录日志，不把内部细节返回给客户端。
+    """
+    if isinstance(e, (HTTPException, QueueFullError)):
+        raise e
+    message = error_message(e)
+    return jsonify({'success': False, 'message': message}), (200 if isinstance(e, ValueError) else 500)
+
+def is_large_request():
+    """请求体达到 LARGE_REQUEST_BYTES，或为长度未知的分块上传"""
+    if request.content_length is None:
+        return 'chunked' in request.headers.get('Transfer-Encoding', '').lower()
+    return request.content_length >= LARGE_REQUEST_BYTES
+
+def admit_request():
+    """按请求体大小选择准入闸门，返回准入的上下文管理器"""
+    gate = large_request_gate if is_large_request() else request_gate
+    return gate.admit()
+
+def admission(view):
+    """重计算接口的准入控制：准入后才执行视图，排队已满或等待超时时返回 503"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with admit_request():
+            return view(*args, **kwargs)
+    return wrapper
+
+def analyze_text(text, stopwords, progress=None):
+    """分词并按停用词过滤，返回 DocumentCounts；各阶段耗时与输入规模计入性能指标"""
+    with timed('segment'):
+        token_counts = count_tokens(text, progress=progress)
+    record_size(len(text), sum(token_counts.values()))
+    with timed('filter'):
+        return DocumentCounts(token_counts, stopwords)
+
+def render_full(word_freq, params, output, on_stage=None):
+    """正式渲染词云并按输出格式与预设编码，返回 (前10个高频词, 图像字节, 布局)
+
+    on_stage(阶段, 百分比) 用于报告后台任务进度。
+    """
+    # 生成词云
+    if on_stage is not None:
+        on_stage('render', 70)
+    with timed('layout'):
+        wordcloud = render_wordcloud(word_freq, params)
+    
+    # 按请求的输出格式编码（SVG 由布局直接生成，无需绘制图像）
+    if on_stage is not None:
+        on_stage('encode', 95)
+    with timed('draw'):
+        image = None if output[0] == 'svg' else wordcloud.to_image()
+    with timed('encode'):
+        data = encode_wordcloud(wordcloud, *output, image=image)
+    
+    # 获取前10个高频词
+    return get_top_words(word_freq), data, wordcloud.layout_
+
+def render_cached(cache_key, params, output, get_word_freq, on_stage=None):
+    """优先返回缓存的词云结果，未命中时调用 get_word_freq() 获取词频并正式渲染"""
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    result = render_full(get_word_freq(), params, output, on_stage)
+    result_cache.put(cache_key, *result)
+    return result
+
+def publish_result(job, doc_id, params, output, result, replaces):
+    """后台任务完成时直接把结果保存到提交任务的会话，返回 (文档ID, 图像ID, 前10个高频词)
+
+    不依赖前端查询任务状态，保存图片等操作随时取到的都是正式结果。
+    """
+    top_words, data, layout = result
+    image_id, _ = store_image(output, params, data, layout)
+    session_store.update(
+        job.owner, functools.partial(replace_image, image_id=image_id, replaces=replaces)
+    )
+    return doc_id, image_id, top_words
+
+def refine_job(job, doc_id, params, output, cache_key, word_freq, preview_id):
+    """后台任务：预览返回后完成正式渲染，并在会话中替换预览"""
+    result = render_cached(cache_key, params, output, lambda: word_freq, job.update)
+    return publish_result(job, doc_id, params, output, result, preview_id)
+
+def refine_preview(entry):
+    """同步完成预览对应的正式渲染（优先使用缓存结果），返回 (图像ID, 图像条目)"""
+    cache_key, params, word_freq = entry['refine']
+    _, data, layout = render_cached(cache_key, params, entry['output'], lambda: word_freq)
+    return store_image(entry['output'], params, data, layout)
+
+def preview_response(doc_id, stopwords, params, output, get_word_freq):
+    """快速预览：缓存中已有正式结果时直接返回，否则先返回低精度预览
+
+    正式渲染提交到后台任务，完成后由任务在会话中替换预览，前端通过 refine_url
+    查询并替换显示的图像；任务队列已满时同步完成正式渲染。预览与正式结果都
+    直接按请求的输出格式编码。
+    """
+    cache_key = make_key(doc_id, stopwords, params, output)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return wordcloud_response(doc_id, params, output, *cached)
+    
+    # 只保留正式渲染会用到的高频词，后续停用词变化不影响已提交的任务
+    word_freq = dict(get_top_words(get_word_freq(), params['max_words']))
+    preview = preview_params(params)
+    with timed('preview'):
+        wordcloud = render_wordcloud(word_freq, preview)
+        data = encode_wordcloud(wordcloud, *output)
+    
+    # 预览先设为当前图像，再提交正式渲染，任务完成时才能据此替换
+    response = wordcloud_response(
+        doc_id, preview, output, get_top_words(word_freq), data, wordcloud.layout_,
+        refine=(cache_key, params, word_freq)
+    )
+    try:
+        job = job_queue.submit(
+            g.sid, refine_job, doc_id, params, output, cache_key, word_freq,
+            get_session()['image_id']
+        )
+    except QueueFullError:
+        return wordcloud_response(
+            doc_id, params, output,
+            *render_cached(cache_key, params, output, lambda: word_freq)
+        )
+    
+    response['refine_url'] = url_for('job_status', job_id=job.id)
+    return response
+
+def store_image(output, params, data, layout, refine=None):
+    """把词云图像保存到图像存储，返回 (图像ID, 图像条目)
+
+    同时保存布局与渲染参数，请求其他输出格式或保存图片时据此重新编码。
+    预览图像的 refine 为 (缓存键, 正式渲染参数, 词频)，用于完成正式渲染。
+    """
+    image_id = image_digest(data)
+    entry = {
+        'data': data, 'output': output, 'layout': layout, 'params': params,
+        'preview': refine is not None, 'refine': refine
+    }
+    image_store.put(image_id, entry, len(data) + len(layout) * LAYOUT_ITEM_BYTES)
+    return image_id, entry
+
+def wordcloud_response(doc_id, params, output, top_words, data, layout, refine=None):
+    """保存当前词云图像并构造返回给前端的数据
+
+    图像按请求的输出格式只编码一次，前端通过 /image/<图像ID> 获取，不再内联
+    base64。图像保存在图像存储中，会话只记录图像ID。
+    """
+    image_id, _ = store_image(output, params, data, layout, refine)
+    update_session(functools.partial(add_image, image_id=image_id))
+    return image_response(doc_id, image_id, top_words, refine is not None)
+
+def image_response(doc_id, image_id, top_words, preview=False):
+    """构造返回给前端的词云数据"""
+    return {
+        'success': True,
+        'doc_id': doc_id,
+        'wordcloud_url': url_for('image', image_id=image_id),
+        'frequencies': top_words,
+        'preview': preview
+    }
+
+def request_json(required=True):
+    """返回请求体中的 JSON 对象
+
+    请求体不是 JSON 对象（如列表、字符串或无法解析）时抛出 ValueError；
+    required 为 False 时允许没有请求体，返回空字典。
+    """
+    data = request.get_json(silent=True)
+    if data is None and not required:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError('请求格式错误')
+    return data
+
+def requested_output():
+    """请求指定的图像输出格式与预设（JSON 字段或查询参数 format、preset）
+
+    两者都未指定时返回 None，此时使用渲染时已编码的图像。
+    """
+    data = request.get_json(silent=True) if request.is_json else None
+    if not isinstance(data, dict):
+        data = {}
+    output_format = data.get('format') or request.args.get('format')
+    preset = data.get('preset') or request.args.get('preset')
+    if not output_format and not preset:
+        return None
+    return check_output(output_format, preset)
+
+def requested_params():
+    """请求指定的画布尺寸与遮罩（JSON 字段或查询参数 width、height、mask），返回渲染参数
+
+    都未指定时为默认渲染参数；默认字号按画布尺寸等比缩放，超大画布缩小后布局。
+    """
+    data = request.get_json(silent=True) if request.is_json else None
+    if not isinstance(data, dict):
+        data = {}
+    values = {key: data.get(key) or request.args.get(key) for key in ('width', 'height', 'mask')}
+    if not any(values.values()):
+        return RENDER_PARAMS
+    mask = mask_path(values['mask']) if values['mask'] else None
+    return canvas_params(values['width'], values['height'], mask)
+
+def encode_entry(image_id, entry, output, scale=1, admit=None):
+    """按输出格式与预设编码图像存储中的词云图像，返回 (图像ID, 字节)
+
+    与渲染时相同的格式与尺寸直接返回已编码的图像；其他格式与尺寸按布局重新
+    绘制（SVG 直接由布局生成），每种只编码一次，编码结果另存于图像存储中。
+    admit 为准入控制（见 admit_request），只在需要编码时进入。
+    """
+    if output == entry['output'] and scale == 1:
+        return image_id, entry['data']
+    key = f'{image_id}/{output[0]}/{output[1]}/{scale}'
+    encoded = image_store.get(key)
+    if encoded is None:
+        with admit() if admit is not None else contextlib.nullcontext(), timed('encode'):
+            data = encode_wordcloud(from_layout(entry['layout'], entry['params'], scale), *output)
+        encoded = (image_digest(data), data)
+        image_store.put(key, encoded, len(data))
+    return encoded
+
+def send_image(image_id, data, output_format='png', immutable=True, **kwargs):
+    """直接发送已编码的图像字节，附带ETag与缓存头，支持条件请求
+
+    immutable 为 True 时（按内容寻址的 /image/<图像ID>）浏览器可缓存 IMAGE_MAX_AGE
+    秒；否则（内容随会话变化的固定地址 /save_image）每次都用 ETag 重新验证。
+    能否访问图像取决于会话，因此只允许浏览器私有缓存，代理不得共享缓存。
+    """
+    response = send_file(
+        io.BytesIO(data),
+        mimetype=OUTPUT_FORMATS[output_format][0],
+        etag=image_id,
+        conditional=True,
+        max_age=IMAGE_MAX_AGE if immutable else None,
+        **kwargs
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
 
-# 停用词列表
-STOPWORDS = set([
-    # 标点符号
-    '，', '。', '！', '？', '、', '；', '：', '"', '"', ''', ''', '（', '）', 
-    '【', '】', '《', '》', '〈', '〉', '…', '—', '～', '@', '#', '￥', '%',
-    # 英文标点
-    *list(string.punctuation),
-    # 常见语气词和虚词
-    '啊', '哎', '哎呀', '哎哟', '唉', '嗯', '呢', '吧', '啦', '呀', '哦', '噢',
-    '的', '了', '着', '呢', '吧', '啊', '啦', '呀', '哦', '噢', '嘛', '吗',
-    '都', '就', '而', '而且', '但是', '但', '却', '呢', '吧', '啊', '啦', 
-    '这', '那', '这个', '那个', '这些', '那些',
-    '什么', '谁', '哪', '哪个', '哪些', '怎么', '怎么样', '怎样', '为什么',
-    '是', '不是', '没', '没有', '不', '不要', '得', '地', '的'
-])
-
-# 用户自定义停用词
-custom_stopwords = set()
-
-# 当前词云图像
-current_wordcloud = None
+def read_upload():
+    """分块读取上传的文件并分词计数，返回 (未过滤词频, 文档ID)
+
+    直接以请求体发送文件内容时边接收边分词；multipart 表单（字段名 file）由
+    Werkzeug 先完整接收（较大的文件写入临时文件），再从中分块读取。编码默认
+    自动识别 UTF-8/GBK，也可通过查询参数 encoding 指定。文档ID取上传字节的
+    哈希，在读取过程中同步计算。
+    """
+    upload_file = request.files.get('file')
+    stream = upload_file.stream if upload_file else request.stream
+    digest = hashlib.sha256()
+    
+    def read_chunks():
+        for chunk in iter_file_chunks(stream):
+            digest.update(chunk)
+            yield chunk
+    
+    with timed('segment'):
+        token_counts = count_stream(read_chunks(), request.args.get('encoding'))
+    record_size(tokens=sum(token_counts.values()))
+    return token_counts, digest.hexdigest()
+
+def generate_job(job, text, stopwords, params, output, replaces):
+    """后台任务：分词、渲染并编码词云，完成后保存到会话"""
+    doc_id = text_digest(text)
+    
+    def segment():
+        # 分词阶段占总进度的 0-70%
+        job.update('segment', 0)
+        document = analyze_text(
+            text, stopwords, lambda done, total: job.update('segment', 70 * done / total)
+        )
+        documents.put((job.owner, doc_id), document)
+        return document.word_freq
+    
+    result = render_cached(
+        make_key(doc_id, stopwords, params, output), params, output, segment, job.update
+    )
+    return publish_result(job, doc_id, params, output, result, replaces)
+
+def rerender_document(doc_id):
+    """停用词变化后基于已保存的分词结果重绘词云，文档不存在时返回 None"""
+    state = get_session()
+    document = documents.get((g.sid, doc_id)) if doc_id else None
+    if document is None:
+        return None
+    
+    stopwords = build_stopwords(state['stopwords'])
+    
+    def refilter():
+        with timed('filter'):
+            return document.set_stopwords(stopwords)
+    
+    return preview_response(
+        doc_id, stopwords, requested_params(), requested_output() or check_output(), refilter
+    )
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/generate', methods=['POST'])
+@admission
 def generate():
     try:
-        data = request.get_json()
-        text = data.get('text', '').strip()
+        data = request_json()
+        text = str(data.get('text') or '').strip()
         
         if not text:
             return jsonify({'success': False, 'message': '请输入文本内容'})
         
-        # 分词并过滤停用词
-        words = list(jieba.cut(text))
-        filtered_words = [word for word in words if (
-            word not in STOPWORDS and
-            word not in custom_stopwords and
-            len(word.strip()) > 1 and
-            not word.isspace() and
-            not re.match(r'^[0-9]+$', word)
-        )]
-        
-        # 统计词频
-        word_freq = Counter(filtered_words)
-        
-        # 生成词云
-        wordcloud = WordCloud(
-            font_path="msyh.ttc",
-            width=600,
-            height=400,
-            background_color='white',
-            max_words=100,
-            min_font_size=10,
-            max_font_size=100
-        ).generate_from_frequencies(word_freq)
-        
-        # 保存当前词云图像
-        global current_wordcloud
-        current_wordcloud = wordcloud
-        
-        # 将词云图像转换为base64
-        img_buffer = io.BytesIO()
-        wordcloud.to_image().save(img_buffer, format='PNG')
-        img_str = base64.b64encode(img_buffer.getvalue()).decode()
-        
-        # 获取前10个高频词
-        top_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        return jsonify({
-            'success': True,
-            'wordcloud_image': f'data:image/png;base64,{img_str}',
-            'frequencies': top_words
-        })
+        # 先校验输出格式与画布参数，避免分词后才发现参数错误
+        output = requested_output() or check_output()
+        params = requested_params()
+        doc_id = text_digest(text)
+        stopwords = build_stopwords(get_session()['stopwords'])
+        
+        # 大文本（且没有缓存结果）转为后台任务，前端轮询任务状态显示进度
+        if (len(text) >= ASYNC_THRESHOLD and
+                make_key(doc_id, stopwords, params, output) not in result_cache):
+            job = job_queue.submit(
+                g.sid, generate_job, text, stopwords, params, output, get_session()['image_id']
+            )
+            return jsonify({
+                'success': True,
+                'status_url': url_for('job_status', job_id=job.id),
+                **job.to_dict()
+            }), 202
+        
+        def segment():
+            # 分词并统计词频，保留未过滤结果供停用词变化时增量重绘
+            document = analyze_text(text, stopwords)
+            documents.put((g.sid, doc_id), document)
+            return document.word_freq
+        
+        # 相同文本、停用词与渲染参数直接返回缓存结果，否则先返回预览
+        return jsonify(preview_response(doc_id, stopwords, params, output, segment))
+        
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/upload', methods=['POST'])
+@admission
+def upload():
+    """流式上传文本文件：边接收边解码、分词和计数，不构造完整字符串"""
+    try:
+        output = requested_output() or check_output()
+        params = requested_params()
+        token_counts, doc_id = read_upload()
+        if not any(word.strip() for word in token_counts):
+            return jsonify({'success': False, 'message': '文件内容为空'})
+        
+        stopwords = build_stopwords(get_session()['stopwords'])
+        with timed('filter'):
+            document = DocumentCounts(token_counts, stopwords)
+        documents.put((g.sid, doc_id), document)
+        
+        return jsonify(
+            preview_response(doc_id, stopwords, params, output, lambda: document.word_freq)
+        )
         
     except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
+        return error_response(e)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    get_session()
+    job = job_queue.get(job_id, g.sid)
+    if job is None:
+        return jsonify({'success': False, 'message': '任务不存在或已过期'}), 404
+    
+    status = job.to_dict()
+    if job.stage == 'error':
+        return jsonify({'success': False, 'message': job.error, **status})
+    if job.stage == 'done':
+        # 结果已由任务保存到会话，只返回图像地址
+        return jsonify({**image_response(*job.result), **status})
+    return jsonify({'success': True, **status})
 
 @app.route('/add_stopword', methods=['POST'])
+@admission
 def add_stopword():
     try:
-        data = request.get_json()
-        word = data.get('word', '').strip()
+        data = request_json()
+        word = str(data.get('word') or '').strip()
         
         if not word:
             return jsonify({'success': False, 'message': '请输入要添加的停用词'})
         
-        if word in custom_stopwords:
+        if word in get_session()['stopwords']:
             return jsonify({'success': False, 'message': '该词已在停用词列表中'})
         
-        custom_stopwords.add(word)
-        return jsonify({'success': True})
+        update_session(lambda state: state['stopwords'].add(word))
+        
+        # 已有该文档的分词结果时直接返回重绘后的词云
+        return jsonify(rerender_document(data.get('doc_id')) or {'success': True})
         
     except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
+        return error_response(e)
 
 @app.route('/remove_stopword', methods=['POST'])
+@admission
 def remove_stopword():
     try:
-        data = request.get_json()
-        word = data.get('word', '').strip()
+        data = request_json()
+        word = str(data.get('word') or '').strip()
         
         if not word:
             return jsonify({'success': False, 'message': '请选择要删除的停用词'})
         
-        if word not in custom_stopwords:
+        if word not in get_session()['stopwords']:
             return jsonify({'success': False, 'message': '该词不在停用词列表中'})
         
-        custom_stopwords.remove(word)
-        return jsonify({'success': True})
+        update_session(lambda state: state['stopwords'].discard(word))
+        
+        # 已有该文档的分词结果时直接返回重绘后的词云
+        return jsonify(rerender_document(data.get('doc_id')) or {'success': True})
         
     except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
+        return error_response(e)
 
 @app.route('/save_image', methods=['GET'])
+@admission
 def save_image():
     try:
-        if current_wordcloud is None:
+        image_id = get_session()['image_id']
+        entry = session_image(image_id)
+        if entry is None:
             return '请先生成词云', 400
-            
-        img_buffer = io.BytesIO()
-        current_wordcloud.to_image().save(img_buffer, format='PNG')
-        img_buffer.seek(0)
-        
-        return send_file(
-            img_buffer,
-            mimetype='image/png',
+        if entry['preview']:
+            # 不保存低精度的预览布局：正式渲染尚未完成时同步完成
+            image_id, entry = refine_preview(entry)
+        
+        # 按布局以请求的格式编码全分辨率图像，每种格式只编码一次
+        output = requested_output() or check_output()
+        full_id, data = encode_entry(image_id, entry, output, save_scale(entry['params']))
+        return send_image(
+            full_id,
+            data,
+            output[0],
+            immutable=False,
             as_attachment=True,
-            download_name='wordcloud.png'
+            download_name=f'wordcloud.{OUTPUT_FORMATS[output[0]][1]}'
         )
         
+    except ValueError as e:
+        return str(e), 400
     except Exception as e:
-        return str(e), 500
+        return error_message(e), 500
+
+@app.route('/image/<image_id>', methods=['GET'])
+def image(image_id):
+    entry = session_image(image_id)
+    if entry is None:
+        return '图像不存在或已过期', 404
+    try:
+        output = requested_output()
+    except ValueError as e:
+        return str(e), 400
+    if output is None:
+        return send_image(image_id, entry['data'], entry['output'][0])
+    # 其他格式需要重新编码，与生成词云的接口一样经过准入控制
+    encoded_id, data = encode_entry(image_id, entry, output, admit=admit_request)
+    return send_image(encoded_id, data, output[0])
+
+@app.route('/reset', methods=['POST'])
+def reset():
+    get_session()
+    session_store.delete(g.sid)
+    return jsonify({'success': True})
+
+@app.route('/compare', methods=['POST'])
+@admission
+def compare_documents():
+    """多文档对比：计算每篇文档相对其余文档的区分性关键词，并可生成词云
+
+    请求体为 JSON：documents 为文本列表或 [{name, text}]；method 为 log-odds
+    （默认）或 tfidf；top 为每篇文档返回的关键词数；cloud 为 side（各文档关键词
+    并排，默认）、contrast（target 指定的文档与其余文档的对比词云）或 none。
+    画布尺寸、遮罩与输出格式参数与 /generate 相同。
+    """
+    try:
+        data = request_json(required=False)
+        items = data.get('documents') or []
+        if not isinstance(items, list) or len(items) < 2:
+            return jsonify({'success': False, 'message': '请提供至少两篇文档'})
+        if len(items) > MAX_COMPARE_DOCUMENTS:
+            return jsonify({'success': False, 'message': f'一次最多对比 {MAX_COMPARE_DOCUMENTS} 篇文档'})
+        
+        method = data.get('method') or DEFAULT_METHOD
+        top = data.get('top')
+        try:
+            top = 30 if top is None else int(top)
+        except (TypeError, ValueError):
+            top = 0
+        cloud = data.get('cloud') or 'side'
+        target = data.get('target')
+        try:
+            target = 0 if target is None else int(target)
+        except (TypeError, ValueError):
+            target = -1
+        if not 1 <= top <= MAX_COMPARE_TOP:
+            return jsonify({'success': False, 'message': f'关键词数量应为 1-{MAX_COMPARE_TOP} 的整数'})
+        if cloud not in ('side', 'contrast', 'none'):
+            return jsonify({'success': False, 'message': '词云类型应为 side、contrast 或 none'})
+        if cloud == 'side' and len(items) > MAX_PANELS:
+            return jsonify({
+                'success': False,
+                'message': f'并排词云最多 {MAX_PANELS} 篇文档，请减少文档或使用 contrast、none'
+            })
+        if not 0 <= target < len(items):
+            return jsonify({'success': False, 'message': '对比目标超出文档范围'})
+        output = requested_output() or check_output()
+        params = requested_params()
+        
+        names, texts = [], []
+        for index, item in enumerate(items, 1):
+            if isinstance(item, dict):
+                names.append(str(item.get('name') or f'文档{index}'))
+                texts.append(str(item.get('text') or ''))
+            else:
+                names.append(f'文档{index}')
+                texts.append(str(item))
+        
+        stopwords = build_stopwords(get_session()['stopwords'])
+        documents = []
+        for text in texts:
+            with timed('segment'):
+                token_counts = count_tokens(text)
+            with timed('filter'):
+                documents.append(filter_counts(token_counts, stopwords))
+        record_size(sum(map(len, texts)), sum(sum(d.values()) for d in documents))
+        
+        with timed('score'):
+            matrix, keywords = compare(documents, method, top)
+        response = {
+            'success': True,
+            'method': method,
+            'vocabulary': len(matrix.words),
+            'documents': [
+                {'name': name, 'tokens': int(total), 'keywords': words}
+                for name, total, words in zip(names, matrix.doc_totals, keywords)
+            ]
+        }
+        if cloud == 'none':
+            return jsonify(response)
+        
+        with timed('layout'):
+            if cloud == 'side':
+                layout, params = render_side_by_side([dict(words) for words in keywords], params)
+                wordcloud = from_layout(layout, params)
+            else:
+                vector = matrix.log_odds_vector(target)
+                wordcloud = render_contrast(
+                    dict(matrix.top_words(vector, top)), dict(matrix.top_words(-vector, top)), params
+                )
+        with timed('draw'):
+            image = None if output[0] == 'svg' else wordcloud.to_image()
+        with timed('encode'):
+            data = encode_wordcloud(wordcloud, *output, image=image)
+        
+        doc_id = text_digest('\0'.join([method, cloud, str(target), *texts]))
+        response.update(wordcloud_response(
+            doc_id, params, output, keywords[target] if cloud == 'contrast' else keywords[0],
+            data, wordcloud.layout_
+        ))
+        return jsonify(response)
+        
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/masks', methods=['POST'])
+@admission
+def upload_mask():
+    """上传遮罩图片（multipart 字段 mask，或直接以请求体发送），返回遮罩ID
+
+    生成词云时通过 mask 参数指定遮罩ID，图片中接近白色与透明的区域不放置词语。
+    """
+    try:
+        upload_file = request.files.get('mask')
+        data = upload_file.read() if upload_file else request.get_data()
+        if not data:
+            return jsonify({'success': False, 'message': '请选择遮罩图片'})
+        
+        mask_id, width, height = save_mask(data)
+        return jsonify({'success': True, 'mask_id': mask_id, 'width': width, 'height': height})
+        
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/corpora', methods=['GET'])
+def list_corpora():
+    return jsonify({'success': True, 'corpora': freq_store.corpora()})
+
+@app.route('/corpora/<name>/documents', methods=['POST'])
+@admission
+def ingest_document(name):
+    """把一篇文本的词频累加到语料中
+
+    请求体为 JSON {text, date}，或与 /upload 相同的文件内容（日期通过查询参数
+    date 指定）；日期格式为 YYYY-MM-DD，默认为当天。同一文档重复导入不会重复计数。
+    """
+    try:
+        if request.is_json:
+            data = request_json()
+            text = str(data.get('text') or '').strip()
+            if not text:
+                return jsonify({'success': False, 'message': '请输入文本内容'})
+            with timed('segment'):
+                token_counts, doc_id = count_tokens(text), text_digest(text)
+            record_size(len(text), sum(token_counts.values()))
+            day = data.get('date')
+        else:
+            token_counts, doc_id = read_upload()
+            day = request.args.get('date')
+        
+        added = freq_store.ingest(name, token_counts, day, doc_id)
+        return jsonify({'success': True, 'corpus': name, 'doc_id': doc_id, 'added': added})
+        
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/corpora/<name>/top', methods=['GET'])
+def corpus_top(name):
+    """语料（可用查询参数 start、end 限定日期范围）的前 n 个高频词"""
+    try:
+        frequencies = freq_store.counts(
+            name,
+            request.args.get('start'),
+            request.args.get('end'),
+            get_session()['stopwords'],
+            min(request.args.get('n', 10, type=int), MAX_CORPUS_TOP)
+        )
+        return jsonify({'success': True, 'frequencies': list(frequencies.items())})
+        
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/corpora/<name>/wordcloud', methods=['POST'])
+@admission
+def corpus_wordcloud(name):
+    """由保存的词频生成语料（或 start 至 end 日期范围内）的词云，无需重新分词"""
+    try:
+        data = request_json(required=False)
+        start, end = data.get('start'), data.get('end')
+        revision = freq_store.revision(name)
+        if revision is None:
+            return jsonify({'success': False, 'message': '语料不存在'}), 404
+        
+        # 文档ID由语料名称、日期范围与版本号决定，导入新文档后缓存自然失效
+        doc_id = text_digest(f"{name}\0{start}\0{end}\0{revision}")
+        custom_stopwords = get_session()['stopwords']
+        output = requested_output() or check_output()
+        params = requested_params()
+        
+        def get_word_freq():
+            with timed('query'):
+                word_freq = freq_store.counts(
+                    name, start, end, custom_stopwords, params['max_words']
+                )
+            if not word_freq:
+                raise ValueError('该时间范围内没有词语')
+            return word_freq
+        
+        return jsonify(
+            preview_response(
+                doc_id, build_stopwords(custom_stopwords), params, output, get_word_freq
+            )
+        )
+        
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/corpora/<name>', methods=['DELETE'])
+def delete_corpus(name):
+    try:
+        if not freq_store.delete(name):
+            return jsonify({'success': False, 'message': '语料不存在'}), 404
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify({**result_cache.stats(), 'image_store': image_store.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 文本格式的性能指标：各阶段耗时、输入规模直方图、结果缓存与准入控制统计"""
+    stats = result_cache.stats()
+    lines = []
+    for name, kind, description in (
+        ('hits', 'counter', '结果缓存命中次数'),
+        ('misses', 'counter', '结果缓存未命中次数'),
+        ('evictions', 'counter', '结果缓存淘汰条目数'),
+        ('entries', 'gauge', '结果缓存条目数'),
+        ('bytes', 'gauge', '结果缓存占用字节数')
+    ):
+        metric = f"wordcloud_cache_{name}{'_total' if kind == 'counter' else ''}"
+        lines += [f'# HELP {metric} {description}', f'# TYPE {metric} {kind}', f'{metric} {stats[name]}']
+    gates = {'normal': request_gate.stats(), 'large': large_request_gate.stats()}
+    for name, kind, description in (
+        ('active', 'gauge', '执行中的重计算请求数'),
+        ('waiting', 'gauge', '等待准入的请求数'),
+        ('rejected', 'counter', '因排队已满或等待超时返回 503 的请求数')
+    ):
+        metric = f"wordcloud_admission_{name}{'_total' if kind == 'counter' else ''}"
+        lines += [f'# HELP {metric} {description}', f'# TYPE {metric} {kind}']
+        lines += [f'{metric}{{gate="{gate}"}} {stats[name]}' for gate, stats in gates.items()]
+    return app.response_class(render_metrics(lines), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', debug=True) 
\ No newline at end of file
+    # 开发服务器，设置 WORDCLOUD_DEBUG=1 开启调试模式；生产环境使用 gunicorn（见 wsgi.py）
+    app.run(
+        host=os.environ.get('WORDCLOUD_HOST', '0.0.0.0'),
+        port=int(os.environ.get('WORDCLOUD_PORT', 5000)),
+        debug=os.environ.get('WORDCLOUD_DEBUG', '') not in ('', '0'),
+        threaded=True
+    ) 
\ No newline at end of file
@@ -0,0 +1,322 @@
+# 词云生成流程基准测试：合成语料上分阶段与端到端计时、峰值内存，结果写出为JSON
+#
+# 语料由 jieba 自带词典中的常用词与合成英文单词按词频随机组成，固定随机种子，
+# 同一环境下每次生成的文本完全相同；全程离线运行。各阶段单独计时：
+#     segment（分词）、filter（过滤）、top（取高频词）、layout（布局）、draw（绘制）、encode（PNG编码）
+# 端到端通过 Flask 测试客户端调用 /generate，分别记录得到第一张图（预览）与正式图像的耗时。
+#
+# 用法：
+#     python benchmarks/bench_pipeline.py --font msyh.ttc -o results.json
+#     python benchmarks/bench_pipeline.py --sizes 1KB,1MB --baseline baseline.json
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from importlib import metadata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 默认语料大小（UTF-8 字节数）
+DEFAULT_SIZES = '1KB,10KB,100KB,1MB,10MB,100MB'
+
+# 较快的小规模组合
+QUICK_SIZES = '1KB,10KB,100KB'
+
+UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+# 合成语料的词表规模
+CHINESE_VOCABULARY = 20000
+ENGLISH_VOCABULARY = 5000
+
+# 英文单词由这些音节拼成
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ra', 'to', 'shi', 'den', 'vor', 'pel', 'qua', 'ster', 'ing', 'tion')
+
+STAGES = ('segment', 'filter', 'top', 'layout', 'draw', 'encode')
+
+
+def parse_size(text):
+    """把 1KB、10MB 之类的大小转换为字节数"""
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def build_vocabulary(seed):
+    """返回 (中文词表, 英文词表)，均为 [(词语, 权重)]
+
+    中文取 jieba 自带词典中词频最高的词，英文为按 Zipf 分布赋予权重的合成单词。
+    """
+    import jieba
+
+    jieba.initialize()
+    chinese = sorted(
+        ((word, freq) for word, freq in jieba.dt.FREQ.items() if freq > 0 and len(word) > 1),
+        key=lambda item: (-item[1], item[0])
+    )[:CHINESE_VOCABULARY]
+
+    rng = random.Random(seed)
+    english = set()
+    while len(english) < ENGLISH_VOCABULARY:
+        english.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))))
+    english = sorted(english)
+    rng.shuffle(english)
+    english = [(word, 1e6 / rank ** 1.1) for rank, word in enumerate(english, 1)]
+    return chinese, english
+
+
+def generate_corpus(size, vocabulary, english_ratio, seed):
+    """生成约 size 字节（UTF-8）的中英文混合语料"""
+    rng = random.Random(seed)
+    pools = []
+    for words in vocabulary:
+        cum_weights = []
+        total = 0
+        for _, weight in words:
+            total += weight
+            cum_weights.append(total)
+        pools.append(([word for word, _ in words], cum_weights))
+    (chinese, chinese_weights), (english, english_weights) = pools
+
+    parts = []
+    total = 0
+    while total < size:
+        count = rng.randint(6, 16)
+        if rng.random() < english_ratio:
+            words = rng.choices(english, cum_weights=english_weights, k=count)
+            sentence = ' '.join(words).capitalize() + '. '
+        else:
+            words = rng.choices(chinese, cum_weights=chinese_weights, k=count)
+            sentence = ''.join(words[:count // 2]) + '，' + ''.join(words[count // 2:]) + '。'
+        if rng.random() < 0.1:
+            sentence += '\n'
+        parts.append(sentence)
+        total += len(sentence.encode('utf-8'))
+    return ''.join(parts).encode('utf-8')[:size].decode('utf-8', 'ignore')
+
+
+def run_pipeline(text, params, step):
+    """按顺序运行各阶段，step(阶段, 函数, *参数) 负责调用函数并测量，返回 (词语总数, 词表大小)"""
+    from text_analysis import STOPWORDS, count_tokens, filter_counts
+    from wordcloud_render import encode_png, render_wordcloud, top_words
+
+    token_counts = step('segment', count_tokens, text)
+    word_freq = step('filter', filter_counts, token_counts, STOPWORDS)
+    step('top', top_words, word_freq, 10)
+    wordcloud = step('layout', render_wordcloud, word_freq, params)
+    image = step('draw', wordcloud.to_image)
+    step('encode', encode_png, image)
+    return sum(token_counts.values()), len(word_freq)
+
+
+def time_stages(text, params):
+    """各阶段计时，返回 ({阶段: 耗时}, 词语总数, 词表大小)"""
+    timings = {}
+
+    def step(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    return (timings, *run_pipeline(text, params, step))
+
+
+def measure_memory(text, params):
+    """用 tracemalloc 测量各阶段的 Python 内存分配峰值（字节），与计时分开运行"""
+    peaks = {}
+
+    def step(stage, func, *args):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = func(*args)
+        peaks[stage] = tracemalloc.get_traced_memory()[1] - before
+        return result
+
+    tracemalloc.start()
+    try:
+        run_pipeline(text, params, step)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def wait_for_job(client, url):
+    """轮询后台任务直到完成或失败，返回最后的状态"""
+    while True:
+        data = client.get(url).get_json()
+        if not data.get('success') or data.get('stage') == 'done':
+            return data
+        time.sleep(0.01)
+
+
+def run_end_to_end(client, app_module, text):
+    """通过测试客户端调用 /generate，返回 (得到第一张图的耗时, 得到正式图像的耗时)"""
+    app_module.result_cache.clear()
+    start = time.perf_counter()
+    data = client.post('/generate', json={'text': text}).get_json()
+    first = None
+    while True:
+        if not data.get('success'):
+            raise RuntimeError(data.get('message', '端到端测试失败'))
+        if data.get('wordcloud_url') and first is None:
+            first = time.perf_counter() - start
+        # 大文本返回后台任务（status_url），预览之后还有正式渲染任务（refine_url）
+        url = data.get('status_url') or data.get('refine_url')
+        if url is None:
+            return first, time.perf_counter() - start
+        data = wait_for_job(client, url)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def summarize(samples):
+    return {'median': median(samples), 'min': min(samples)}
+
+
+def compare(results, baseline, threshold):
+    """与基准结果比较各阶段中位数耗时，打印对比并返回退化项数量"""
+    regressions = 0
+    print(f"\n与基准比较（{baseline['meta'].get('date', '?')}，退化阈值 {threshold:.0%}）：")
+    for size, result in results['results'].items():
+        old = baseline['results'].get(size)
+        if old is None:
+            continue
+        rows = [(stage, old['stages'].get(stage), result['stages'][stage]) for stage in result['stages']]
+        rows += [(f'e2e_{name}', old.get('end_to_end', {}).get(name), value)
+                 for name, value in result.get('end_to_end', {}).items()]
+        for stage, before, after in rows:
+            if not before or not after:
+                continue
+            ratio = after['median'] / before['median'] - 1
+            flag = ''
+            if ratio > threshold:
+                flag = '  ← 退化'
+                regressions += 1
+            elif ratio < -threshold:
+                flag = '  ← 改进'
+            print(f"{size:>6} {stage:<16} {before['median'] * 1000:10.1f} ms → "
+                  f"{after['median'] * 1000:10.1f} ms  {ratio:+7.1%}{flag}")
+    return regressions
+
+
+def package_versions():
+    versions = {}
+    for name in ('jieba', 'wordcloud', 'Pillow', 'numpy', 'Flask'):
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="词云生成流程基准测试")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f"语料大小列表（默认 {DEFAULT_SIZES}）")
+    parser.add_argument('--quick', action='store_true', help=f"只测试 {QUICK_SIZES}")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取中位数")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子")
+    parser.add_argument('--english-ratio', type=float, default=0.2, help="英文句子的比例（默认 0.2）")
+    parser.add_argument('--font', help="字体文件（默认 msyh.ttc 或环境变量 WORDCLOUD_FONT）")
+    parser.add_argument('--no-e2e', action='store_true', help="跳过 Flask 端到端测试")
+    parser.add_argument('--no-memory', action='store_true', help="跳过峰值内存测量")
+    parser.add_argument('-o', '--output', help="写出JSON结果文件")
+    parser.add_argument('--baseline', help="与之比较的基准JSON结果文件")
+    parser.add_argument('--threshold', type=float, default=0.1, help="判定退化的耗时增幅（默认 0.1 即 10%%）")
+    args = parser.parse_args()
+
+    if args.font:
+        os.environ['WORDCLOUD_FONT'] = args.font
+    # 端到端测试使用临时的词频库，不影响正式数据
+    temp_dir = tempfile.TemporaryDirectory()
+    os.environ['WORDCLOUD_FREQ_STORE'] = os.path.join(temp_dir.name, 'corpora.db')
+
+    # 项目模块在设置字体等环境变量之后才导入
+    from wordcloud_render import render_params
+
+    params = render_params(random_state=args.seed)
+    vocabulary = build_vocabulary(args.seed)
+    sizes = [(label.strip(), parse_size(label))
+             for label in (QUICK_SIZES if args.quick else args.sizes).split(',')]
+
+    client = app_module = None
+    if not args.no_e2e:
+        import app as app_module
+        client = app_module.app.test_client()
+
+    results = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'packages': package_versions(),
+            'seed': args.seed,
+            'english_ratio': args.english_ratio,
+            'repeat': args.repeat
+        },
+        'results': {}
+    }
+
+    for label, size in sizes:
+        text = generate_corpus(size, vocabulary, args.english_ratio, args.seed)
+        samples = {stage: [] for stage in STAGES}
+        for _ in range(args.repeat):
+            timings, tokens, vocabulary_size = time_stages(text, params)
+            for stage, seconds in timings.items():
+                samples[stage].append(seconds)
+        result = {
+            'bytes': size,
+            'chars': len(text),
+            'tokens': tokens,
+            'vocabulary': vocabulary_size,
+            'stages': {stage: summarize(values) for stage, values in samples.items()}
+        }
+        if not args.no_memory:
+            result['peak_memory'] = measure_memory(text, params)
+        if client is not None:
+            first, final = zip(*(run_end_to_end(client, app_module, text) for _ in range(args.repeat)))
+            result['end_to_end'] = {'first_image': summarize(first), 'final_image': summarize(final)}
+        results['results'][label] = result
+
+        stages = '  '.join(f"{stage} {values['median'] * 1000:.1f}"
+                           for stage, values in result['stages'].items())
+        print(f"{label:>6}  {len(text):>10} 字符 {tokens:>10} 词  {stages} (ms)")
+        if 'end_to_end' in result:
+            e2e = result['end_to_end']
+            print(f"{'':>6}  端到端：首张图 {e2e['first_image']['median'] * 1000:.1f} ms，"
+                  f"正式图 {e2e['final_image']['median'] * 1000:.1f} ms")
+        if 'peak_memory' in result:
+            print(f"{'':>6}  峰值内存：" + '  '.join(
+                f"{stage} {peak / 1024 / 1024:.1f}MB" for stage, peak in result['peak_memory'].items()))
+
+    # 进程生命周期内的最大常驻内存（Linux 下单位为 KB）
+    results['meta']['max_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(f"进程最大常驻内存：{results['meta']['max_rss_bytes'] / 1024 / 1024:.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=1)
+        print(f"结果已写入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
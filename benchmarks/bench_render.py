@@ -0,0 +1,71 @@
+# 词云渲染基准测试：每次新建 WordCloud 并重新加载字体 vs 复用实例与字体/尺寸缓存
+#
+# 用法：
+#     python benchmarks/bench_render.py [--font 字体文件] [--words N] [--repeat N]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import wordcloud.wordcloud as wordcloud_module
+from PIL import ImageDraw, ImageFont
+from wordcloud import WordCloud
+
+import wordcloud_render
+from wordcloud_render import render_params, render_wordcloud
+
+
+def sample_frequencies(count, seed=0):
+    """生成固定的中文词频表"""
+    rng = random.Random(seed)
+    chars = [chr(code) for code in range(0x4E00, 0x4E00 + 2000)]
+    return {
+        ''.join(rng.choice(chars) for _ in range(rng.randint(2, 4))): rng.randint(1, 1000)
+        for _ in range(count)
+    }
+
+
+def plain_render(word_freq, params):
+    """原实现：每次新建 WordCloud，字体与文字尺寸不缓存"""
+    wordcloud_module.ImageFont, wordcloud_module.ImageDraw = ImageFont, ImageDraw
+    return WordCloud(**params).generate_from_frequencies(word_freq).to_image()
+
+
+def engine_render(word_freq, params):
+    """渲染引擎：复用实例，字体与文字尺寸跨请求缓存"""
+    wordcloud_module.ImageFont = wordcloud_render._CachedImageFont
+    wordcloud_module.ImageDraw = wordcloud_render._CachedImageDraw
+    return render_wordcloud(word_freq, params).to_image()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="词云渲染基准测试")
+    parser.add_argument('--font', help="字体文件（默认 msyh.ttc 或环境变量 WORDCLOUD_FONT）")
+    parser.add_argument('--words', type=int, default=100, help="词语数量")
+    parser.add_argument('--repeat', type=int, default=5, help="重复渲染次数（相同词表）")
+    args = parser.parse_args()
+
+    params = render_params(font_path=args.font, random_state=42)
+    word_freq = sample_frequencies(args.words)
+
+    images = {}
+    for name, func in (("每次新建（旧）", plain_render), ("渲染引擎", engine_render)):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            images[name] = np.asarray(func(word_freq, params))
+            timings.append(time.perf_counter() - start)
+        print(f"{name:<10} 首次 {timings[0] * 1000:8.1f} ms  "
+              f"之后中位数 {sorted(timings[1:])[len(timings[1:]) // 2] * 1000:8.1f} ms")
+
+    if not (images["每次新建（旧）"] == images["渲染引擎"]).all():
+        print("警告：两种方式渲染的图像不一致")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
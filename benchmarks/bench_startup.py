@@ -0,0 +1,98 @@
+# 冷启动基准测试：依赖检查方式与 jieba 词典加载方式对启动/首次分词耗时的影响
+#
+# 每项测试都在新的 Python 进程中运行，以测量真实的冷启动时间。
+#
+# 用法：
+#     python benchmarks/bench_startup.py [--repeat N]
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 被测代码片段，均在最后打印耗时（秒）
+SNIPPETS = {
+    "依赖检查：pkg_resources": """
+import time
+start = time.perf_counter()
+import pkg_resources
+for name in ('jieba', 'wordcloud', 'Pillow'):
+    pkg_resources.get_distribution(name).version
+print(time.perf_counter() - start)
+""",
+    "依赖检查：importlib.metadata": """
+import time
+start = time.perf_counter()
+from importlib import metadata
+for name in ('jieba', 'wordcloud', 'Pillow'):
+    metadata.version(name)
+print(time.perf_counter() - start)
+""",
+    "首次分词：无词典缓存": """
+import time, jieba
+start = time.perf_counter()
+list(jieba.cut('词云统计应用冷启动测试'))
+print(time.perf_counter() - start)
+""",
+    "首次分词：使用词典缓存": """
+import time
+import text_analysis, jieba
+start = time.perf_counter()
+list(jieba.cut('词云统计应用冷启动测试'))
+print(time.perf_counter() - start)
+""",
+    "首次分词：启动时后台预热": """
+import time
+import text_analysis, jieba
+text_analysis.warm_up()
+time.sleep(1.0)  # 模拟创建窗口/启动服务器的耗时
+start = time.perf_counter()
+list(jieba.cut('词云统计应用冷启动测试'))
+print(time.perf_counter() - start)
+""",
+}
+
+
+def run_snippet(code, env):
+    """在新进程中运行代码片段，返回其打印的耗时"""
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动基准测试")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取中位数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, code in SNIPPETS.items():
+            env = dict(os.environ, WORDCLOUD_CACHE_DIR=cache_dir)
+            if name == "首次分词：无词典缓存":
+                # 指向空的临时目录且每次清空，强制 jieba 重新构建词典
+                code = f"import jieba; jieba.dt.tmp_dir = {cache_dir!r}\n" + code
+            timings = []
+            for _ in range(args.repeat):
+                if name == "首次分词：无词典缓存":
+                    for file_name in os.listdir(cache_dir):
+                        os.remove(os.path.join(cache_dir, file_name))
+                try:
+                    timings.append(run_snippet(code, env))
+                except subprocess.CalledProcessError as e:
+                    print(f"{name:<24} 运行失败：{e.stderr.strip().splitlines()[-1]}")
+                    break
+            else:
+                timings.sort()
+                print(f"{name:<24} {timings[len(timings) // 2] * 1000:10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
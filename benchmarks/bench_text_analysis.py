@@ -0,0 +1,102 @@
+# 分词与词频统计基准测试：对比旧的逐词过滤路径与 text_analysis 引擎
+#
+# 用法：
+#     python benchmarks/bench_text_analysis.py [文本文件] [--repeat N]
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jieba
+
+from text_analysis import STOPWORDS, count_words, filter_counts
+
+# 未指定文件时使用的示例段落
+SAMPLE_TEXT = (
+    "词云是对文本中出现频率较高的关键词予以视觉上的突出，形成关键词云层或关键词渲染，"
+    "从而过滤掉大量的文本信息，使浏览者只要一眼扫过文本就可以领略文本的主旨。"
+    "Python 3.11 在 2022 年发布，性能提升了 25% 左右，这个版本的解释器更快了。"
+    "我们在 100 份报告里统计了 jieba 分词的速度，但是结果并不是那么稳定。\n"
+)
+
+
+def legacy_count(text, custom_stopwords):
+    """原 app.generate / WordCloudApp.filter_words 的处理路径"""
+    words = list(jieba.cut(text))
+    filtered_words = [word for word in words if (
+        word not in STOPWORDS and
+        word not in custom_stopwords and
+        len(word.strip()) > 1 and
+        not word.isspace() and
+        not re.match(r'^[0-9]+$', word)
+    )]
+    return Counter(filtered_words)
+
+
+def legacy_filter(words, custom_stopwords):
+    """原路径中仅过滤与计数的部分"""
+    return Counter([word for word in words if (
+        word not in STOPWORDS and
+        word not in custom_stopwords and
+        len(word.strip()) > 1 and
+        not word.isspace() and
+        not re.match(r'^[0-9]+$', word)
+    )])
+
+
+def engine_filter(words, custom_stopwords):
+    """引擎中仅过滤与计数的部分"""
+    return filter_counts(Counter(words), STOPWORDS | frozenset(custom_stopwords))
+
+
+def best_of(func, repeat, *args):
+    """运行 repeat 次，返回最短耗时与结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分词与词频统计基准测试")
+    parser.add_argument('file', nargs='?', help="UTF-8 文本文件，默认使用内置示例段落")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取最短耗时")
+    parser.add_argument('--copies', type=int, default=2000, help="内置示例段落的重复次数")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as file:
+            text = file.read()
+    else:
+        text = SAMPLE_TEXT * args.copies
+
+    custom_stopwords = {'报告', '结果'}
+    jieba.initialize()
+    words = list(jieba.cut(text))
+    print(f"文本长度：{len(text)} 字符，词语总数：{len(words)}")
+
+    rows = [
+        ("完整路径（旧）", legacy_count, (text, custom_stopwords)),
+        ("完整路径（引擎）", count_words, (text, custom_stopwords)),
+        ("仅过滤计数（旧）", legacy_filter, (words, custom_stopwords)),
+        ("仅过滤计数（引擎）", engine_filter, (words, custom_stopwords)),
+    ]
+    results = {}
+    for name, func, func_args in rows:
+        elapsed, results[name] = best_of(func, args.repeat, *func_args)
+        print(f"{name:<12} {elapsed * 1000:10.1f} ms  {len(words) / elapsed:14,.0f} 词/秒")
+
+    if results["完整路径（旧）"] != results["完整路径（引擎）"]:
+        print("警告：两种路径的词频结果不一致")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+# 语料词频库：把多篇文本的词频按语料与日期累加保存在 sqlite 中
+#
+# 词语只在词表中保存一次，词频表按 (语料, 日期, 词语ID) 存放整数计数。语料或
+# 时间窗口的词云与高频词直接由保存的计数汇总得到，无需重新读取或分词原文。
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+from text_analysis import STOPWORDS, filter_counts
+
+# 默认数据库路径，可通过环境变量 WORDCLOUD_FREQ_STORE 修改
+DEFAULT_PATH = os.environ.get(
+    'WORDCLOUD_FREQ_STORE',
+    os.path.join(os.path.expanduser('~'), '.local', 'share', 'wordcloud_app', 'corpora.db')
+)
+
+# 语料名称的最大长度
+MAX_NAME_LENGTH = 100
+
+# 按词语查询词表ID时每批的数量（sqlite 参数个数有上限）
+_BATCH = 500
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS vocab (
+    id INTEGER PRIMARY KEY,
+    word TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS corpora (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    revision INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    corpus_id INTEGER NOT NULL,
+    doc_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    PRIMARY KEY (corpus_id, doc_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counts (
+    corpus_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    word_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (corpus_id, day, word_id)
+) WITHOUT ROWID;
+'''
+
+
+def parse_day(value):
+    """把 date 或 'YYYY-MM-DD' 字符串转换为日期字符串，None 保持不变"""
+    if value is None:
+        return None
+    if isinstance(value, date):
+        return value.isoformat()[:10]
+    try:
+        return date.fromisoformat(str(value).strip()).isoformat()
+    except ValueError:
+        raise ValueError(f"日期格式应为 YYYY-MM-DD：{value}") from None
+
+
+def check_name(name):
+    """校验语料名称，返回去除首尾空白后的名称"""
+    name = (name or '').strip()
+    if not name or len(name) > MAX_NAME_LENGTH:
+        raise ValueError(f"语料名称不能为空且不超过 {MAX_NAME_LENGTH} 个字符")
+    return name
+
+
+class FrequencyStore:
+    """按语料与日期累加保存词频的 sqlite 存储，可在多个进程间共享"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        """每个线程使用独立的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _corpus(self, conn, name):
+        """返回语料的 (ID, 版本号)，不存在时返回 None"""
+        return conn.execute(
+            'SELECT id, revision FROM corpora WHERE name = ?', (check_name(name),)
+        ).fetchone()
+
+    def _word_ids(self, conn, words):
+        """返回词语到词表ID的映射，新词先加入词表"""
+        conn.executemany('INSERT OR IGNORE INTO vocab (word) VALUES (?)', ((w,) for w in words))
+        ids = {}
+        for start in range(0, len(words), _BATCH):
+            batch = words[start:start + _BATCH]
+            ids.update(conn.execute(
+                f"SELECT word, id FROM vocab WHERE word IN ({','.join('?' * len(batch))})", batch
+            ))
+        return ids
+
+    def ingest(self, corpus, token_counts, day=None, doc_id=None):
+        """把一篇文档的词频累加到语料的某一天
+
+        token_counts 为未过滤的词频，保存前按内置停用词与长度、数字规则过滤；
+        doc_id 用于去重，同一语料中已导入过的文档不再重复累加，此时返回 False。
+        """
+        name = check_name(corpus)
+        day = parse_day(day) or date.today().isoformat()
+        word_freq = filter_counts(token_counts, STOPWORDS)
+        if doc_id is None:
+            doc_id = hashlib.sha256(repr(sorted(word_freq.items())).encode('utf-8')).hexdigest()
+
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO corpora (name, created) VALUES (?, ?)', (name, time.time())
+            )
+            corpus_id = self._corpus(conn, name)[0]
+            added = conn.execute(
+                'INSERT OR IGNORE INTO documents (corpus_id, doc_id, day, tokens) VALUES (?, ?, ?, ?)',
+                (corpus_id, doc_id, day, sum(word_freq.values()))
+            ).rowcount
+            if not added:
+                return False
+
+            word_ids = self._word_ids(conn, list(word_freq))
+            conn.executemany(
+                'INSERT INTO counts (corpus_id, day, word_id, count) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (corpus_id, day, word_id) DO UPDATE SET count = count + excluded.count',
+                ((corpus_id, day, word_ids[word], count) for word, count in word_freq.items())
+            )
+            conn.execute('UPDATE corpora SET revision = revision + 1 WHERE id = ?', (corpus_id,))
+        return True
+
+    def revision(self, corpus):
+        """返回语料的版本号（每导入一篇文档加一），语料不存在时返回 None"""
+        row = self._corpus(self._connect(), corpus)
+        return row[1] if row else None
+
+    def counts(self, corpus, start=None, end=None, stopwords=(), limit=None):
+        """汇总语料在 [start, end] 日期范围内的词频，按次数降序返回 Counter
+
+        stopwords 为额外排除的词语；limit 限制返回的词语数量（正整数）。语料
+        不存在时返回空的 Counter。
+        """
+        if limit is not None and limit < 1:
+            raise ValueError("返回的词语数量必须为正整数")
+        conn = self._connect()
+        row = self._corpus(conn, corpus)
+        if row is None:
+            return Counter()
+
+        query = ('SELECT v.word, SUM(c.count) AS total FROM counts c '
+                 'JOIN vocab v ON v.id = c.word_id WHERE c.corpus_id = ?')
+        params = [row[0]]
+        if start is not None:
+            query += ' AND c.day >= ?'
+            params.append(parse_day(start))
+        if end is not None:
+            query += ' AND c.day <= ?'
+            params.append(parse_day(end))
+        query += ' GROUP BY c.word_id ORDER BY total DESC, c.word_id'
+        if limit is not None:
+            # 被排除的词最多占 len(stopwords) 行
+            query += ' LIMIT ?'
+            params.append(limit + len(stopwords))
+
+        word_freq = Counter()
+        for word, total in conn.execute(query, params):
+            if word not in stopwords:
+                word_freq[word] = total
+        if limit is not None:
+            word_freq = Counter(dict(list(word_freq.items())[:limit]))
+        return word_freq
+
+    def corpora(self):
+        """列出所有语料及其文档数、词语总数与日期范围"""
+        rows = self._connect().execute(
+            'SELECT c.name, COUNT(d.doc_id), COALESCE(SUM(d.tokens), 0), MIN(d.day), MAX(d.day) '
+            'FROM corpora c LEFT JOIN documents d ON d.corpus_id = c.id '
+            'GROUP BY c.id ORDER BY c.name'
+        )
+        return [
+            {'name': name, 'documents': documents, 'tokens': tokens,
+             'first_day': first_day, 'last_day': last_day}
+            for name, documents, tokens, first_day, last_day in rows
+        ]
+
+    def delete(self, corpus):
+        """删除语料及其词频，返回是否存在该语料"""
+        with self._connect() as conn:
+            row = self._corpus(conn, corpus)
+            if row is None:
+                return False
+            for table in ('counts', 'documents'):
+                conn.execute(f'DELETE FROM {table} WHERE corpus_id = ?', (row[0],))
+            conn.execute('DELETE FROM corpora WHERE id = ?', (row[0],))
+        return True
@@ -0,0 +1,45 @@
+# gunicorn 配置：gunicorn -c gunicorn.conf.py wsgi:app
+#
+# 默认多个工作进程（每个进程多线程）：会话、词云图像与后台任务状态保存在共享的
+# sqlite 存储中，同一会话的请求可以落到任一进程；大文本与上传文件在各进程的
+# 分词进程池中分词，不占用请求线程的 GIL。重计算的并发由应用内的准入控制限制，
+# 线程数只决定能同时保持多少个连接，查询进度、获取图像等轻量请求不会被正在处理
+# 的大文本阻塞。
+import os
+
+bind = os.environ.get('WORDCLOUD_BIND', '0.0.0.0:8000')
+
+# 工作进程数默认取 CPU 核数（2-4 个）
+_cpus = os.cpu_count() or 1
+workers = int(os.environ.get('WORDCLOUD_HTTP_WORKERS', max(2, min(4, _cpus))))
+worker_class = 'gthread'
+threads = int(os.environ.get('WORDCLOUD_HTTP_THREADS', 16))
+if workers > 1:
+    # 多个工作进程时会话、图像与任务状态必须使用 sqlite 共享存储
+    _data_dir = os.path.join(os.path.expanduser('~'), '.local', 'share', 'wordcloud_app')
+    os.makedirs(_data_dir, exist_ok=True)
+    os.environ.setdefault(
+        'WORDCLOUD_SESSION_STORE', 'sqlite:///' + os.path.join(_data_dir, 'sessions.db')
+    )
+# 各工作进程的分词进程池平分CPU核数，避免进程数成倍超过核数
+os.environ.setdefault('WORDCLOUD_WORKERS', str(max(1, _cpus // workers)))
+
+# 大文件上传与分词可能持续较长时间
+timeout = int(os.environ.get('WORDCLOUD_HTTP_TIMEOUT', 300))
+graceful_timeout = 30
+keepalive = 5
+
+# 处理过超大文本的进程内存不会全部归还系统，定期重启工作进程
+max_requests = 2000
+max_requests_jitter = 200
+
+# 请求行与请求头大小（请求体大小由应用按接口限制）
+limit_request_line = 8190
+limit_request_fields = 100
+limit_request_field_size = 8190
+
+# jieba 词典在后台线程中加载，不在 fork 前预加载应用
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,244 @@
+# 后台任务队列：大文本词云在有界线程池中生成，并报告当前阶段与进度，任务状态
+# 可同步到共享存储供其他工作进程查询；
+# 准入控制：限制同时在请求线程中执行的重计算数量，等待过多时快速拒绝
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger('wordcloud')
+
+# 已结束任务的保留时间（秒），过期后状态不可再查询
+JOB_TTL = 600
+
+# 最多保留的已结束任务数，超出时提前清理最早结束的任务
+MAX_FINISHED_JOBS = 256
+
+# 共享存储中每条任务状态的估计字节数
+JOB_STATE_BYTES = 1024
+
+# 任务阶段及其说明
+STAGES = {
+    'queued': '排队中',
+    'segment': '分词统计',
+    'render': '生成词云',
+    'encode': '编码图像',
+    'done': '已完成',
+    'error': '失败'
+}
+
+
+class QueueFullError(Exception):
+    """等待中的任务已达上限"""
+
+
+def error_message(e, default='服务器内部错误'):
+    """返回可以展示给用户的错误信息
+
+    ValueError 为参数或输入错误，其信息直接返回；其他异常可能包含路径等内部
+    细节，只记录日志并返回通用信息。
+    """
+    if isinstance(e, ValueError):
+        return str(e)
+    logger.error('未处理的异常', exc_info=e)
+    return default
+
+
+class Job:
+    """一个后台任务的状态"""
+
+    def __init__(self, owner, publish=None):
+        self.id = uuid.uuid4().hex
+        self.owner = owner          # 提交任务的会话ID
+        self.stage = 'queued'
+        self.percent = 0
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self._publish = publish     # 状态变化时调用 publish(任务)
+
+    def update(self, stage, percent):
+        """更新任务阶段与完成百分比"""
+        changed = (stage, int(percent)) != (self.stage, self.percent)
+        self.stage = stage
+        self.percent = int(percent)
+        if changed and self._publish is not None:
+            self._publish(self)
+
+    def state(self):
+        """返回可在进程间共享的任务状态（含结果）"""
+        return {
+            'owner': self.owner,
+            'stage': self.stage,
+            'percent': self.percent,
+            'result': self.result,
+            'error': self.error
+        }
+
+    @classmethod
+    def from_state(cls, job_id, state):
+        """由共享存储中的任务状态构造任务（只用于查询）"""
+        job = cls(state['owner'])
+        job.id = job_id
+        job.stage = state['stage']
+        job.percent = state['percent']
+        job.result = state['result']
+        job.error = state['error']
+        return job
+
+    @property
+    def done(self):
+        return self.stage in ('done', 'error')
+
+    def to_dict(self):
+        """返回任务状态（不含结果）"""
+        return {
+            'job_id': self.id,
+            'stage': self.stage,
+            'stage_name': STAGES[self.stage],
+            'percent': self.percent
+        }
+
+
+class JobQueue:
+    """有界后台任务队列
+
+    max_workers 个线程并发执行任务，最多 max_pending 个任务等待或执行中，
+    超出时提交失败，由调用方快速拒绝请求。提供 store（见 session_store 的
+    BlobStore）时任务状态与结果同步写入其中，查询不在本进程的任务时从中读取，
+    多个工作进程共享 sqlite 存储时任一进程都能返回任务进度。
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, store=None):
+        self.max_pending = max_pending
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='wordcloud-job')
+        self._jobs = {}
+        self._finished = deque()    # 已结束任务的ID，按结束顺序
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        """清理结束超过 JOB_TTL 的任务，已结束任务超过 MAX_FINISHED_JOBS 个时清理最早结束的
+
+        返回清理的任务ID，由调用方在锁外从共享存储中删除。
+        """
+        purged = []
+        while self._finished:
+            job = self._jobs[self._finished[0]]
+            if now - job.finished_at <= JOB_TTL and len(self._finished) <= MAX_FINISHED_JOBS:
+                break
+            self._finished.popleft()
+            del self._jobs[job.id]
+            purged.append(job.id)
+        return purged
+
+    def _publish(self, job):
+        """把任务状态写入共享存储，写入失败不影响任务本身"""
+        try:
+            self.store.put(job.id, job.state(), JOB_STATE_BYTES)
+        except Exception as e:
+            logger.warning('任务状态写入共享存储失败', exc_info=e)
+
+    def _forget(self, job_ids):
+        """从共享存储中删除已清理的任务"""
+        if self.store is not None:
+            for job_id in job_ids:
+                self.store.delete(job_id)
+
+    def submit(self, owner, func, *args):
+        """提交任务，func(job, *args) 的返回值作为任务结果"""
+        with self._lock:
+            purged = self._purge(time.time())
+            if self._pending >= self.max_pending:
+                raise QueueFullError('等待中的任务过多')
+            self._pending += 1
+            job = Job(owner, self._publish if self.store is not None else None)
+            self._jobs[job.id] = job
+        self._forget(purged)
+        if self.store is not None:
+            self._publish(job)
+        self._executor.submit(self._run, job, func, args)
+        return job
+
+    def _run(self, job, func, args):
+        """在工作线程中执行任务并记录结果或错误"""
+        try:
+            job.result = func(job, *args)
+            job.update('done', 100)
+        except Exception as e:
+            job.error = error_message(e)
+            job.update('error', job.percent)
+        finally:
+            with self._lock:
+                job.finished_at = time.time()
+                self._finished.append(job.id)
+                self._pending -= 1
+                purged = self._purge(job.finished_at)
+            self._forget(purged)
+
+    def get(self, job_id, owner):
+        """返回属于 owner 的任务，不存在时返回 None
+
+        本进程没有该任务时从共享存储读取（由其他工作进程执行的任务）。
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            state = self.store.get(job_id)
+            if state is not None:
+                job = Job.from_state(job_id, state)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+
+class AdmissionGate:
+    """有界准入闸门
+
+    最多 max_active 个请求同时执行，另有最多 max_waiting 个请求排队等待；
+    队列已满或等待超过 timeout 秒时抛出 QueueFullError，由调用方返回 503。
+    """
+
+    def __init__(self, max_active, max_waiting, timeout=10):
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def admit(self):
+        """在准入后执行 with 语句块"""
+        with self._condition:
+            if self.active >= self.max_active:
+                if self.waiting >= self.max_waiting:
+                    self.rejected += 1
+                    raise QueueFullError('等待中的请求过多')
+                self.waiting += 1
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self.active < self.max_active, self.timeout
+                    )
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    self.rejected += 1
+                    raise QueueFullError('等待超时')
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.active -= 1
+                self._condition.notify()
+
+    def stats(self):
+        """返回执行中、等待中的请求数与累计拒绝次数"""
+        with self._condition:
+            return {'active': self.active, 'waiting': self.waiting, 'rejected': self.rejected}
@@ -0,0 +1,131 @@
+# 多文档对比：在共享词表上用 NumPy 计算各文档的区分性关键词
+#
+# 所有文档的词频存为一个稀疏的“文档 × 词语”矩阵（按文档排列的行号、词语ID与
+# 次数三个数组），TF-IDF 与对数几率（log-odds）得分都在这些数组上整体计算，
+# 不逐词循环，几百篇文档也只需一次数组运算。
+import numpy as np
+
+# 关键词得分方法及其说明
+METHODS = {
+    'log-odds': "对数几率比（以全部文档为先验的 z 分数），衡量该文档相对其余文档的用词偏好",
+    'tfidf': "TF-IDF，词频乘以逆文档频率，突出只在少数文档中频繁出现的词语"
+}
+
+# 默认得分方法
+DEFAULT_METHOD = 'log-odds'
+
+
+class TermMatrix:
+    """多篇文档在共享词表上的稀疏词频矩阵
+
+    documents 为各文档过滤后的词频（词语 -> 次数）。words 为共享词表，
+    rows、cols、counts 为按文档顺序排列的非零项，indptr[i]:indptr[i + 1]
+    为第 i 篇文档的非零项范围。
+    """
+
+    def __init__(self, documents):
+        documents = list(documents)
+        if len(documents) < 2:
+            raise ValueError("至少需要两篇文档才能对比")
+
+        vocabulary = {}
+        cols, counts = [], []
+        for index, word_freq in enumerate(documents, 1):
+            if not word_freq:
+                raise ValueError(f"第 {index} 篇文档没有可统计的词语")
+            cols.append(np.fromiter(
+                (vocabulary.setdefault(word, len(vocabulary)) for word in word_freq),
+                dtype=np.int64, count=len(word_freq)
+            ))
+            counts.append(np.fromiter(word_freq.values(), dtype=np.float64, count=len(word_freq)))
+
+        self.words = list(vocabulary)
+        lengths = np.array([len(c) for c in cols], dtype=np.int64)
+        self.indptr = np.concatenate(([0], np.cumsum(lengths)))
+        self.rows = np.repeat(np.arange(len(documents)), lengths)
+        self.cols = np.concatenate(cols)
+        self.counts = np.concatenate(counts)
+
+        self.n_docs = len(documents)
+        self.doc_totals = np.bincount(self.rows, weights=self.counts, minlength=self.n_docs)
+        self.term_totals = np.bincount(self.cols, weights=self.counts, minlength=len(self.words))
+        self.doc_freq = np.bincount(self.cols, minlength=len(self.words))
+        self.total = self.doc_totals.sum()
+
+    def tfidf(self):
+        """各非零项的 TF-IDF 得分（每篇文档的得分向量按 L2 归一化）"""
+        tf = self.counts / self.doc_totals[self.rows]
+        idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+        scores = tf * idf[self.cols]
+        norms = np.sqrt(np.bincount(self.rows, weights=scores ** 2, minlength=self.n_docs))
+        return scores / norms[self.rows]
+
+    def log_odds(self):
+        """各非零项的对数几率 z 分数：该文档相对其余所有文档"""
+        return _log_odds(
+            self.counts,
+            self.term_totals[self.cols],
+            self.doc_totals[self.rows],
+            self.total
+        )
+
+    def log_odds_vector(self, index):
+        """第 index 篇文档相对其余文档在整个词表上的 z 分数
+
+        正值为该文档偏好的词语，负值为其余文档偏好的词语。
+        """
+        start, end = self.indptr[index], self.indptr[index + 1]
+        counts = np.zeros(len(self.words))
+        counts[self.cols[start:end]] = self.counts[start:end]
+        return _log_odds(counts, self.term_totals, self.doc_totals[index], self.total)
+
+    def scores(self, method=DEFAULT_METHOD):
+        """按方法计算各非零项的得分"""
+        if method == 'tfidf':
+            return self.tfidf()
+        if method == 'log-odds':
+            return self.log_odds()
+        raise ValueError(f"未知的对比方法：{method}（可选：{'、'.join(METHODS)}）")
+
+    def top(self, scores, n=20):
+        """每篇文档得分最高的前 n 个词（只保留正得分），返回 [[(词语, 得分)]]"""
+        result = []
+        for index in range(self.n_docs):
+            start, end = self.indptr[index], self.indptr[index + 1]
+            result.append(self._top_slice(scores[start:end], self.cols[start:end], n))
+        return result
+
+    def top_words(self, vector, n=20):
+        """整个词表上的得分向量中最高的前 n 个词（只保留正得分）"""
+        return self._top_slice(vector, np.arange(len(vector)), n)
+
+    def _top_slice(self, scores, cols, n):
+        if n < 1:
+            raise ValueError("关键词数量必须为正整数")
+        positive = np.flatnonzero(scores > 0)
+        if len(positive) > n:
+            positive = positive[np.argpartition(-scores[positive], n - 1)[:n]]
+        order = positive[np.argsort(-scores[positive], kind='stable')]
+        return [(self.words[cols[i]], float(scores[i])) for i in order]
+
+
+def _log_odds(counts, term_totals, doc_total, total):
+    """带信息先验的对数几率 z 分数（Monroe 等，2008）
+
+    先验取全部文档合并的词频：a_w 为词语总次数，a0 为全部词语总数。
+    """
+    rest_counts = term_totals - counts
+    rest_total = total - doc_total
+    with np.errstate(divide='ignore', invalid='ignore'):
+        doc_log = np.log((counts + term_totals) / (doc_total + total - counts - term_totals))
+        rest_log = np.log((rest_counts + term_totals) / (rest_total + total - rest_counts - term_totals))
+        variance = 1 / (counts + term_totals) + 1 / (rest_counts + term_totals)
+        z = (doc_log - rest_log) / np.sqrt(variance)
+    return np.nan_to_num(z, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def compare(documents, method=DEFAULT_METHOD, n=20):
+    """计算每篇文档的区分性关键词，返回 (TermMatrix, [[(词语, 得分)]])"""
+    matrix = TermMatrix(documents)
+    return matrix, matrix.top(matrix.scores(method), n)
+
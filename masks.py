@@ -0,0 +1,163 @@
+# 遮罩：保存上传的遮罩图片，并按 (遮罩, 画布尺寸) 缓存预处理结果
+#
+# 遮罩图片中接近白色（及透明）的区域不放置词语。wordcloud 每次布局都会把遮罩
+# 转换为布尔数组并计算整幅积分图，大画布上这一步本身就要数百毫秒；这里把缩放后
+# 的遮罩、布尔遮罩与初始积分图一起缓存，同一遮罩与尺寸的重复渲染跳过这些准备工作。
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+# 上传的遮罩保存目录，可通过环境变量 WORDCLOUD_MASK_DIR 修改
+MASK_DIR = os.environ.get(
+    'WORDCLOUD_MASK_DIR',
+    os.path.join(os.path.expanduser('~'), '.local', 'share', 'wordcloud_app', 'masks')
+)
+
+# 遮罩图片的最大字节数与最大边长
+MAX_MASK_BYTES = 10 * 1024 * 1024
+MAX_MASK_SIDE = 8192
+
+# 遮罩目录中保存的遮罩数量上限，超出时删除最久未上传的遮罩
+MAX_MASK_FILES = int(os.environ.get('WORDCLOUD_MAX_MASK_FILES', 1000))
+
+# 缓存的预处理遮罩数量上限（每个 4K 画布约占 60MB）
+MAX_PREPARED = int(os.environ.get('WORDCLOUD_MAX_MASKS', 8))
+
+# 灰度高于该值的像素视为白色，不放置词语
+WHITE_THRESHOLD = 128
+
+_MASK_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class PreparedMask:
+    """缩放到画布尺寸的遮罩及其布尔遮罩与初始积分图"""
+
+    def __init__(self, mask):
+        # 0 为可放置词语的区域，255 为遮挡区域，与 wordcloud 的约定一致
+        self.mask = mask
+        self.boolean = mask == 255
+        # 与 wordcloud.IntegralOccupancyMap 的计算方式相同，布局结果一致
+        self.integral = np.cumsum(np.cumsum(255 * self.boolean, axis=1),
+                                  axis=0).astype(np.uint32)
+
+
+# (路径, 修改时间, 宽, 高) -> PreparedMask
+_prepared = OrderedDict()
+# 数组 id -> PreparedMask，用于从 wordcloud 传回的数组找到缓存；缓存持有数组，id 不会被复用
+_by_array = {}
+_lock = threading.Lock()
+
+
+def _to_mask_image(image):
+    """把任意模式的图片转换为灰度图，透明区域视为白色"""
+    if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGBA', image.size, 'white')
+        image = Image.alpha_composite(background, image)
+    return image.convert('L')
+
+
+def save_mask(data):
+    """校验并保存上传的遮罩图片，返回 (遮罩ID, 宽, 高)
+
+    遮罩统一转换为灰度 PNG 保存，遮罩ID取转换后内容的哈希，相同图片只保存一次。
+    """
+    if len(data) > MAX_MASK_BYTES:
+        raise ValueError(f"遮罩图片不能超过 {MAX_MASK_BYTES // 1024 // 1024}MB")
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Exception:
+        raise ValueError("无法识别的遮罩图片") from None
+    # 打开时只解析文件头，先检查尺寸再解码像素，避免解码超大图片
+    if max(image.size) > MAX_MASK_SIDE:
+        raise ValueError(f"遮罩图片的边长不能超过 {MAX_MASK_SIDE} 像素")
+    try:
+        image.load()
+    except Exception:
+        raise ValueError("无法识别的遮罩图片") from None
+
+    buffer = io.BytesIO()
+    _to_mask_image(image).save(buffer, format='PNG')
+    png = buffer.getvalue()
+    mask_id = hashlib.sha256(png).hexdigest()[:32]
+    path = os.path.join(MASK_DIR, f'{mask_id}.png')
+    if os.path.exists(path):
+        # 重新上传的遮罩记为最近使用，不会被优先清理
+        os.utime(path)
+    else:
+        os.makedirs(MASK_DIR, exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(png)
+        os.replace(temp_path, path)
+        _prune_masks()
+    return mask_id, image.width, image.height
+
+
+def _prune_masks():
+    """遮罩数量超过 MAX_MASK_FILES 时按修改时间删除最旧的遮罩"""
+    masks = []
+    with os.scandir(MASK_DIR) as entries:
+        for entry in entries:
+            if _MASK_ID_RE.match(entry.name[:-len('.png')]) and entry.name.endswith('.png'):
+                try:
+                    masks.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+    if len(masks) <= MAX_MASK_FILES:
+        return
+    masks.sort()
+    for _, path in masks[:len(masks) - MAX_MASK_FILES]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # 其他进程已删除
+
+
+def mask_path(mask_id):
+    """返回已保存遮罩的文件路径，遮罩不存在时抛出 ValueError"""
+    mask_id = (mask_id or '').strip().lower()
+    path = os.path.join(MASK_DIR, f'{mask_id}.png')
+    if not _MASK_ID_RE.match(mask_id) or not os.path.exists(path):
+        raise ValueError("遮罩不存在，请重新上传")
+    return path
+
+
+def prepare_mask(path, width, height):
+    """读取遮罩图片并缩放到画布尺寸，返回缓存的 PreparedMask"""
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns, width, height)
+    with _lock:
+        prepared = _prepared.get(key)
+        if prepared is not None:
+            _prepared.move_to_end(key)
+            return prepared
+
+    with Image.open(path) as image:
+        gray = _to_mask_image(image).resize((width, height), Image.LANCZOS)
+    mask = np.where(np.asarray(gray) >= WHITE_THRESHOLD, 255, 0).astype(np.uint8)
+    prepared = PreparedMask(mask)
+
+    with _lock:
+        if key in _prepared:
+            return _prepared[key]
+        _prepared[key] = prepared
+        _by_array[id(prepared.mask)] = _by_array[id(prepared.boolean)] = prepared
+        while len(_prepared) > MAX_PREPARED:
+            _, evicted = _prepared.popitem(last=False)
+            del _by_array[id(evicted.mask)], _by_array[id(evicted.boolean)]
+    return prepared
+
+
+def lookup_mask(array):
+    """按遮罩数组或布尔遮罩数组查找缓存的 PreparedMask，不在缓存中时返回 None"""
+    with _lock:
+        prepared = _by_array.get(id(array))
+    if prepared is None or (prepared.mask is not array and prepared.boolean is not array):
+        return None
+    return prepared
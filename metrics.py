@@ -0,0 +1,181 @@
+# 性能指标：各处理阶段计时、输入规模统计与 Prometheus 文本格式的直方图
+#
+# 用 with timed('阶段'): 包住一个阶段，耗时计入全局直方图；当前上下文（一个
+# 请求或一次生成）通过 start_timings() 开始记录时，同时记入该次的 Timings，用于
+# X-Timing 响应头与桌面版的调试状态栏。
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# 阶段名称及其说明
+STAGES = {
+    'segment': '分词',
+    'filter': '过滤',
+    'query': '查询词频库',
+    'score': '关键词得分',
+    'preview': '预览',
+    'layout': '布局',
+    'draw': '绘制',
+    'encode': '编码',
+    'total': '总计'
+}
+
+# 耗时直方图的桶上界（秒）
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 输入字符数与词语数直方图的桶上界
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+
+class Histogram:
+    """线程安全的累积直方图，按标签值分别统计"""
+
+    def __init__(self, name, description, buckets, label=None):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}   # 标签值 -> [各桶计数, 总和, 次数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        """记录一个观测值"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _labels(self, label_value, **extra):
+        pairs = [(self.label, label_value)] if self.label else []
+        pairs.extend(extra.items())
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+    def render(self):
+        """输出 Prometheus 文本格式"""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items(), key=lambda item: str(item[0]))
+            series = [(label_value, list(counts), total, count)
+                      for label_value, (counts, total, count) in series]
+        for label_value, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = self._labels(label_value, le=f'{bound:g}')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            lines.append(f'{self.name}_bucket{self._labels(label_value, le="+Inf")} {count}')
+            lines.append(f'{self.name}_sum{self._labels(label_value)} {total:g}')
+            lines.append(f'{self.name}_count{self._labels(label_value)} {count}')
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'wordcloud_stage_seconds', '词云生成各阶段耗时（秒）', TIME_BUCKETS, 'stage'
+)
+INPUT_CHARS = Histogram('wordcloud_input_chars', '输入文本的字符数', SIZE_BUCKETS)
+TOKENS = Histogram('wordcloud_tokens', '分词得到的词语总数', SIZE_BUCKETS)
+
+HISTOGRAMS = (STAGE_SECONDS, INPUT_CHARS, TOKENS)
+
+
+class Timings:
+    """一次请求或一次生成的各阶段耗时与输入规模"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}    # 阶段 -> 累计耗时（秒），同一阶段多次计时累加
+        self.input_chars = None
+        self.tokens = None
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def header(self):
+        """X-Timing 响应头的值，如 segment=812.4ms; layout=420.0ms; chars=120000"""
+        parts = [f'{stage}={seconds * 1000:.1f}ms' for stage, seconds in self.stages.items()]
+        if self.input_chars is not None:
+            parts.append(f'chars={self.input_chars}')
+        if self.tokens is not None:
+            parts.append(f'tokens={self.tokens}')
+        return '; '.join(parts)
+
+    def summary(self):
+        """中文摘要，用于桌面版调试状态栏"""
+        parts = [f'{STAGES.get(stage, stage)} {seconds * 1000:.0f}ms'
+                 for stage, seconds in self.stages.items()]
+        if self.input_chars is not None:
+            parts.append(f'{self.input_chars} 字符')
+        if self.tokens is not None:
+            parts.append(f'{self.tokens} 词')
+        return ' · '.join(parts)
+
+
+_current = ContextVar('wordcloud_timings', default=None)
+
+
+def start_timings():
+    """在当前上下文（请求线程或生成线程）中开始记录分阶段耗时"""
+    timings = Timings()
+    _current.set(timings)
+    return timings
+
+
+def finish_timings():
+    """结束当前上下文的记录，记入总耗时并返回 Timings，未开始记录时返回 None
+
+    只有记录过处理阶段的请求（如未命中缓存的生成）才把总耗时计入直方图。
+    """
+    timings = _current.get()
+    if timings is None:
+        return None
+    _current.set(None)
+    elapsed = time.perf_counter() - timings.start
+    if timings.stages:
+        STAGE_SECONDS.observe(elapsed, 'total')
+    timings.add('total', elapsed)
+    return timings
+
+
+@contextmanager
+def timed(stage):
+    """统计一个阶段的耗时"""
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - begin
+        STAGE_SECONDS.observe(elapsed, stage)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(stage, elapsed)
+
+
+def record_size(input_chars=None, tokens=None):
+    """记录输入字符数与分词得到的词语总数"""
+    timings = _current.get()
+    if input_chars is not None:
+        INPUT_CHARS.observe(input_chars)
+        if timings is not None:
+            timings.input_chars = input_chars
+    if tokens is not None:
+        TOKENS.observe(tokens)
+        if timings is not None:
+            timings.tokens = tokens
+
+
+def render_metrics(extra_lines=()):
+    """输出所有直方图（及调用方提供的其他指标）的 Prometheus 文本格式"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,131 @@
+# 词云结果缓存：按文本、生效停用词、渲染参数与输出格式的哈希缓存词频、编码后的图像与布局
+import hashlib
+import threading
+from collections import OrderedDict
+
+# 每个词频条目的额外内存开销估计（字节）
+ENTRY_OVERHEAD = 64
+
+
+def text_digest(text):
+    """计算文本内容的哈希，用作文档ID"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def image_digest(png):
+    """计算已编码图像的哈希，用作图像ID与ETag"""
+    return hashlib.sha256(png).hexdigest()[:32]
+
+
+def make_key(doc_id, stopwords, params, output):
+    """根据文档ID、生效的停用词集合、渲染参数与输出格式（格式, 预设）生成缓存键"""
+    digest = hashlib.sha256()
+    digest.update(doc_id.encode('ascii'))
+    digest.update(b'\0')
+    digest.update('\n'.join(sorted(stopwords)).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(repr(sorted(params.items())).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(repr(tuple(output)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """按字节预算进行LRU淘汰的线程安全结果缓存"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(frequencies, data, layout):
+        """估算一个缓存条目占用的字节数"""
+        words = [word for word, _ in frequencies]
+        words.extend(word for (word, _), *_ in layout)
+        return len(data) + sum(len(word.encode('utf-8')) + ENTRY_OVERHEAD for word in words)
+
+    def __contains__(self, key):
+        """判断缓存中是否有该键（不计入命中统计，也不调整LRU顺序）"""
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """查询缓存，命中时返回 (frequencies, data, layout)，否则返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[:3]
+
+    def put(self, key, frequencies, data, layout):
+        """写入缓存，超出字节预算时淘汰最久未使用的条目
+
+        data 为编码后的图像；layout 为 WordCloud 的布局结果，可据此按其他格式或
+        倍数重新绘制图像。
+        """
+        size = self._entry_size(frequencies, data, layout)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[3]
+            self._entries[key] = (frequencies, data, layout, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[3]
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """返回命中/未命中计数与容量信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+
+class DocumentStore:
+    """按文档ID保存最近分词结果的LRU存储，用于停用词变化后的增量重绘"""
+
+    def __init__(self, max_documents=16):
+        self.max_documents = max_documents
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, doc_id):
+        """返回文档的 DocumentCounts，不存在时返回 None"""
+        with self._lock:
+            document = self._documents.get(doc_id)
+            if document is not None:
+                self._documents.move_to_end(doc_id)
+            return document
+
+    def put(self, doc_id, document):
+        """保存文档，超出数量上限时淘汰最久未使用的文档"""
+        with self._lock:
+            self._documents[doc_id] = document
+            self._documents.move_to_end(doc_id)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
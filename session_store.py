@@ -0,0 +1,311 @@
+# 会话状态存储：按会话隔离自定义停用词与最近的词云图像ID
+#
+# 默认使用进程内存储；多个工作进程部署时使用 sqlite 存储，在进程间共享会话。
+# 会话状态只保存停用词与图像ID，词云图像等较大的数据按ID保存在有字节预算的
+# 键值存储（BlobStore）中，同样可以选择进程内或 sqlite 共享存储。
+import copy
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# 会话默认过期时间（秒）
+DEFAULT_TTL = 3600
+
+
+def new_state():
+    """创建空的会话状态"""
+    return {
+        'stopwords': set(),   # 自定义停用词
+        'images': [],         # 最近的词云图像ID（按生成顺序），图像保存在图像存储中
+        'image_id': None      # 当前词云图像ID
+    }
+
+
+class MemorySessionStore:
+    """进程内会话存储，支持过期时间与会话数量上限"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_sessions=1000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge_expired(self, now):
+        """清理已过期的会话（按最近访问顺序，只需检查头部）"""
+        while self._sessions:
+            sid, (expires, _) = next(iter(self._sessions.items()))
+            if expires > now:
+                break
+            del self._sessions[sid]
+
+    def load(self, sid):
+        """读取会话状态的副本，不存在或已过期时返回空状态"""
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return new_state()
+            self._sessions[sid] = (now + self.ttl, entry[1])
+            self._sessions.move_to_end(sid)
+            return copy.deepcopy(entry[1])
+
+    def update(self, sid, mutate):
+        """读取会话状态、调用 mutate(状态) 修改后保存，返回修改后状态的副本
+
+        同一会话的并发修改依次执行，不会互相覆盖；超出数量上限时淘汰最久未访问的会话。
+        """
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._sessions.get(sid)
+            state = entry[1] if entry is not None else new_state()
+            mutate(state)
+            self._sessions[sid] = (now + self.ttl, state)
+            self._sessions.move_to_end(sid)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return copy.deepcopy(state)
+
+    def delete(self, sid):
+        """删除会话"""
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+
+def _connect(local, path):
+    """每个线程使用独立的数据库连接"""
+    conn = getattr(local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        local.conn = conn
+    return conn
+
+
+class SqliteSessionStore:
+    """基于sqlite文件的会话存储，可在多个工作进程间共享"""
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'sid TEXT PRIMARY KEY, state BLOB NOT NULL, expires REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)')
+
+    def _connect(self):
+        return _connect(self._local, self.path)
+
+    def load(self, sid):
+        """读取会话状态，不存在或已过期时返回空状态"""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT state FROM sessions WHERE sid = ? AND expires > ?', (sid, now)
+        ).fetchone()
+        if row is None:
+            return new_state()
+        with conn:
+            conn.execute('UPDATE sessions SET expires = ? WHERE sid = ?', (now + self.ttl, sid))
+        return pickle.loads(row[0])
+
+    def update(self, sid, mutate):
+        """在写事务中读取会话状态、调用 mutate(状态) 修改后保存，返回修改后的状态
+
+        BEGIN IMMEDIATE 使同一数据库上的修改依次执行，多个进程并发修改同一会话
+        不会互相覆盖；顺带清理过期会话。
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT state FROM sessions WHERE sid = ? AND expires > ?', (sid, now)
+            ).fetchone()
+            state = pickle.loads(row[0]) if row is not None else new_state()
+            mutate(state)
+            conn.execute(
+                'INSERT OR REPLACE INTO sessions (sid, state, expires) VALUES (?, ?, ?)',
+                (sid, pickle.dumps(state, pickle.HIGHEST_PROTOCOL), now + self.ttl)
+            )
+            conn.execute('DELETE FROM sessions WHERE expires <= ?', (now,))
+        return state
+
+    def delete(self, sid):
+        """删除会话"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+
+class MemoryBlobStore:
+    """进程内键值存储，按字节预算与过期时间进行LRU淘汰
+
+    值按原样保存，调用方不应修改取出的值。
+    """
+
+    def __init__(self, max_bytes, ttl=DEFAULT_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()   # 键 -> (过期时间, 值, 字节数)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _purge_expired(self, now):
+        while self._entries:
+            key, (expires, _, size) = next(iter(self._entries.items()))
+            if expires > now:
+                break
+            del self._entries[key]
+            self._bytes -= size
+
+    def get(self, key):
+        """返回键对应的值，不存在或已过期时返回 None"""
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries[key] = (now + self.ttl, entry[1], entry[2])
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value, size):
+        """保存值（size 为估计的字节数），超出字节预算时淘汰最久未使用的条目"""
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (now + self.ttl, value, size)
+            self._bytes += size
+            self._purge_expired(now)
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def delete(self, key):
+        """删除键"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def stats(self):
+        """返回条目数与占用字节数"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+class SqliteBlobStore:
+    """基于sqlite文件的键值存储，可在多个工作进程间共享，按字节预算与过期时间淘汰"""
+
+    def __init__(self, path, table, max_bytes, ttl=DEFAULT_TTL):
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {table} ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, '
+                'expires REAL NOT NULL)'
+            )
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_expires ON {table} (expires)')
+
+    def _connect(self):
+        return _connect(self._local, self.path)
+
+    def get(self, key):
+        """返回键对应的值，不存在或已过期时返回 None"""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            f'SELECT value FROM {self.table} WHERE key = ? AND expires > ?', (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute(f'UPDATE {self.table} SET expires = ? WHERE key = ?', (now + self.ttl, key))
+        return pickle.loads(row[0])
+
+    def put(self, key, value, size):
+        """保存值（size 为估计的字节数），超出字节预算时淘汰最久未使用的条目"""
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, size, expires) VALUES (?, ?, ?, ?)',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), size, now + self.ttl)
+            )
+            conn.execute(f'DELETE FROM {self.table} WHERE expires <= ?', (now,))
+            excess = conn.execute(f'SELECT SUM(size) FROM {self.table}').fetchone()[0] - self.max_bytes
+            if excess > 0:
+                evicted = []
+                for evicted_key, evicted_size in conn.execute(
+                        f'SELECT key, size FROM {self.table} ORDER BY expires'):
+                    if excess <= 0:
+                        break
+                    evicted.append((evicted_key,))
+                    excess -= evicted_size
+                conn.executemany(f'DELETE FROM {self.table} WHERE key = ?', evicted)
+
+    def delete(self, key):
+        """删除键"""
+        with self._connect() as conn:
+            conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def stats(self):
+        """返回条目数与占用字节数"""
+        entries, size = self._connect().execute(
+            f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}'
+        ).fetchone()
+        return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
+
+
+def _store_url(url):
+    return url or os.environ.get('WORDCLOUD_SESSION_STORE', 'memory')
+
+
+def _ttl():
+    return int(os.environ.get('WORDCLOUD_SESSION_TTL', DEFAULT_TTL))
+
+
+def create_session_store(url=None):
+    """根据配置创建会话存储
+
+    url 为 'memory'（默认）或 'sqlite:///数据库文件路径'，未指定时读取环境变量
+    WORDCLOUD_SESSION_STORE；过期时间与会话上限分别读取 WORDCLOUD_SESSION_TTL、
+    WORDCLOUD_MAX_SESSIONS。
+    """
+    url = _store_url(url)
+    if url == 'memory':
+        return MemorySessionStore(_ttl(), int(os.environ.get('WORDCLOUD_MAX_SESSIONS', 1000)))
+    if url.startswith('sqlite:///'):
+        return SqliteSessionStore(url[len('sqlite:///'):], _ttl())
+    raise ValueError(f"不支持的会话存储：{url}")
+
+
+def create_blob_store(table, max_bytes, url=None):
+    """创建与会话存储位置相同的键值存储
+
+    进程内会话存储对应进程内键值存储；sqlite 会话存储对应同一数据库文件中的
+    table 表，多个工作进程共享。过期时间与会话相同。
+    """
+    url = _store_url(url)
+    if url == 'memory':
+        return MemoryBlobStore(max_bytes, _ttl())
+    if url.startswith('sqlite:///'):
+        return SqliteBlobStore(url[len('sqlite:///'):], table, max_bytes, _ttl())
+    raise ValueError(f"不支持的会话存储：{url}")
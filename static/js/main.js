@@ -14,6 +14,96 @@ const addStopwordBtn = document.getElementById('addStopwordBtn');
 const stopwordsList = document.getElementById('stopwordsList');
 const freqList = document.getElementById('freqList');
 const wordcloudImage = document.getElementById('wordcloudImage');
+const progress = document.getElementById('progress');
+const progressBar = document.getElementById('progressBar');
+const progressText = document.getElementById('progressText');
+const outputFormat = document.getElementById('outputFormat');
+const outputPreset = document.getElementById('outputPreset');
+const canvasWidth = document.getElementById('canvasWidth');
+const canvasHeight = document.getElementById('canvasHeight');
+const maskBtn = document.getElementById('maskBtn');
+const maskName = document.getElementById('maskName');
+const clearMaskBtn = document.getElementById('clearMaskBtn');
+
+// 后台任务状态的轮询间隔（毫秒）
+const JOB_POLL_INTERVAL = 500;
+
+// 当前文档ID（服务器据此在停用词变化时增量重绘）
+let currentDocId = null;
+
+// 显示结果的版本号，用于丢弃过期的正式渲染结果
+let renderVersion = 0;
+
+// 超过该大小（字节）的文件直接流式上传到服务器分析，不读入文本框
+const STREAM_UPLOAD_SIZE = 1024 * 1024;
+
+// 当前以流式上传方式导入的文件
+let currentFile = null;
+
+// 各图像格式保存时的文件扩展名
+const OUTPUT_EXTENSIONS = { png8: 'png', webp: 'webp', svg: 'svg' };
+
+// 选择的图像输出格式与编码预设，未选择格式时使用默认PNG
+function outputOptions() {
+    if (!outputFormat.value) {
+        return {};
+    }
+    return { format: outputFormat.value, preset: outputPreset.value };
+}
+
+// 当前遮罩ID（上传后由服务器返回）
+let currentMaskId = null;
+
+// 画布尺寸、遮罩与输出格式，随生成与停用词请求一起发送
+function renderOptions() {
+    const options = { ...outputOptions() };
+    if (canvasWidth.value !== canvasWidth.defaultValue || canvasHeight.value !== canvasHeight.defaultValue) {
+        options.width = canvasWidth.value;
+        options.height = canvasHeight.value;
+    }
+    if (currentMaskId) {
+        options.mask = currentMaskId;
+    }
+    return options;
+}
+
+// 选择并上传遮罩图片
+maskBtn.addEventListener('click', () => {
+    const input = document.createElement('input');
+    input.type = 'file';
+    input.accept = 'image/*';
+    
+    input.onchange = async (e) => {
+        const file = e.target.files[0];
+        if (!file) {
+            return;
+        }
+        const form = new FormData();
+        form.append('mask', file);
+        try {
+            const response = await fetch('/masks', { method: 'POST', body: form });
+            const data = await response.json();
+            if (data.success) {
+                currentMaskId = data.mask_id;
+                maskName.textContent = file.name;
+                clearMaskBtn.style.display = '';
+            } else {
+                showNotification('错误', data.message || '上传遮罩失败');
+            }
+        } catch (error) {
+            showNotification('错误', '服务器连接失败');
+        }
+    };
+    
+    input.click();
+});
+
+// 清除遮罩
+clearMaskBtn.addEventListener('click', () => {
+    currentMaskId = null;
+    maskName.textContent = '选择遮罩';
+    clearMaskBtn.style.display = 'none';
+});
 
 // 主题切换
 let isDarkTheme = false;
@@ -47,22 +137,58 @@ importBtn.addEventListener('click', async () => {
     
     input.onchange = async (e) => {
         const file = e.target.files[0];
-        if (file) {
-            try {
-                const text = await file.text();
-                textInput.value = text;
-            } catch (error) {
-                showNotification('错误', '无法读取文件内容');
-            }
+        if (!file) {
+            return;
+        }
+        if (file.size > STREAM_UPLOAD_SIZE) {
+            // 大文件：请求体直接使用文件对象，由浏览器流式发送
+            textInput.value = '';
+            textInput.placeholder = `已导入大文件：${file.name}（${(file.size / 1024 / 1024).toFixed(1)} MB），内容直接在服务器端分析`;
+            currentFile = file;
+            await uploadFile(file);
+            return;
+        }
+        try {
+            const text = await file.text();
+            currentFile = null;
+            textInput.value = text;
+        } catch (error) {
+            showNotification('错误', '无法读取文件内容');
         }
     };
     
     input.click();
 });
 
+// 流式上传文件并生成词云
+async function uploadFile(file) {
+    try {
+        const response = await fetch('/upload?' + new URLSearchParams(renderOptions()), {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/octet-stream'
+            },
+            body: file
+        });
+        
+        const data = await response.json();
+        if (data.success) {
+            showWordcloud(data);
+        } else {
+            showNotification('错误', data.message || '生成词云失败');
+        }
+    } catch (error) {
+        showNotification('错误', '服务器连接失败');
+    }
+}
+
 // 生成词云
 generateBtn.addEventListener('click', async () => {
     const text = textInput.value.trim();
+    if (!text && currentFile) {
+        await uploadFile(currentFile);
+        return;
+    }
     if (!text) {
         showNotification('警告', '请输入文本内容');
         return;
@@ -74,19 +200,15 @@ generateBtn.addEventListener('click', async () => {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ text })
+            body: JSON.stringify({ text, ...renderOptions() })
         });
         
         const data = await response.json();
-        if (data.success) {
-            // 更新词频统计
-            updateFreqList(data.frequencies);
-            // 更新词云图像
-            wordcloudImage.src = data.wordcloud_image;
-            // 显示停用词区域
-            stopwordsSection.style.display = 'block';
-            // 启用保存按钮
-            saveBtn.disabled = false;
+        if (data.success && data.job_id) {
+            // 大文本转为后台任务，轮询显示进度
+            await waitForJob(data);
+        } else if (data.success) {
+            showWordcloud(data);
         } else {
             showNotification('错误', data.message || '生成词云失败');
         }
@@ -95,6 +217,82 @@ generateBtn.addEventListener('click', async () => {
     }
 });
 
+// 轮询后台任务直到完成，期间显示当前阶段与进度
+async function waitForJob(job) {
+    generateBtn.disabled = true;
+    progress.style.display = 'flex';
+    try {
+        let data = job;
+        while (data.success && data.stage !== 'done') {
+            progressBar.style.width = `${data.percent}%`;
+            progressText.textContent = `${data.stage_name} ${data.percent}%`;
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+            const response = await fetch(job.status_url);
+            data = await response.json();
+        }
+        if (data.success) {
+            showWordcloud(data);
+        } else {
+            showNotification('错误', data.message || '生成词云失败');
+        }
+    } finally {
+        progress.style.display = 'none';
+        generateBtn.disabled = false;
+    }
+}
+
+// 显示词云结果
+function showWordcloud(data) {
+    const version = ++renderVersion;
+    currentDocId = data.doc_id;
+    // 更新词频统计
+    updateFreqList(data.frequencies);
+    // 更新词云图像
+    wordcloudImage.src = data.wordcloud_url;
+    // 显示停用词区域
+    stopwordsSection.style.display = 'block';
+    // 启用保存按钮
+    saveBtn.disabled = false;
+    // 当前显示的是快速预览时，在后台等待正式渲染完成后替换
+    if (data.refine_url) {
+        refineWordcloud(data.refine_url, version);
+    }
+}
+
+// 轮询正式渲染任务，期间若已显示其他结果则放弃
+async function refineWordcloud(url, version) {
+    try {
+        while (version === renderVersion) {
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+            if (version !== renderVersion) {
+                return;
+            }
+            const response = await fetch(url);
+            const data = await response.json();
+            if (!data.success) {
+                return;
+            }
+            if (data.stage === 'done') {
+                if (version === renderVersion) {
+                    showWordcloud(data);
+                }
+                return;
+            }
+        }
+    } catch (error) {
+        // 正式渲染失败时保留预览图像
+    }
+}
+
+// 停用词变化后更新词云：服务器已增量重绘时直接显示，否则重新生成
+function refreshAfterStopwordChange(data) {
+    if (data.wordcloud_url) {
+        showWordcloud(data);
+    } else {
+        generateBtn.click();
+    }
+}
+
 // 更新词频列表
 function updateFreqList(frequencies) {
     freqList.innerHTML = '';
@@ -123,15 +321,15 @@ addStopwordBtn.addEventListener('click', async () => {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ word })
+            body: JSON.stringify({ word, doc_id: currentDocId, ...renderOptions() })
         });
         
         const data = await response.json();
         if (data.success) {
             addStopwordToList(word);
             stopwordInput.value = '';
-            // 重新生成词云
-            generateBtn.click();
+            // 更新词云
+            refreshAfterStopwordChange(data);
         } else {
             showNotification('错误', data.message || '添加停用词失败');
         }
@@ -161,7 +359,7 @@ async function removeStopword(word) {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ word })
+            body: JSON.stringify({ word, doc_id: currentDocId, ...renderOptions() })
         });
         
         const data = await response.json();
@@ -174,8 +372,8 @@ async function removeStopword(word) {
                     break;
                 }
             }
-            // 重新生成词云
-            generateBtn.click();
+            // 更新词云
+            refreshAfterStopwordChange(data);
         } else {
             showNotification('错误', data.message || '删除停用词失败');
         }
@@ -187,7 +385,8 @@ async function removeStopword(word) {
 // 保存图片
 saveBtn.addEventListener('click', async () => {
     try {
-        const response = await fetch('/save_image', {
+        const options = outputOptions();
+        const response = await fetch('/save_image?' + new URLSearchParams(options), {
             method: 'GET'
         });
         
@@ -196,7 +395,7 @@ saveBtn.addEventListener('click', async () => {
             const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
             a.href = url;
-            a.download = 'wordcloud.png';
+            a.download = `wordcloud.${OUTPUT_EXTENSIONS[options.format] || 'png'}`;
             document.body.appendChild(a);
             a.click();
             document.body.removeChild(a);
@@ -210,14 +409,27 @@ saveBtn.addEventListener('click', async () => {
 });
 
 // 重置应用
-resetBtn.addEventListener('click', () => {
+resetBtn.addEventListener('click', async () => {
+    // 清空服务器上的会话状态（自定义停用词与当前词云）
+    try {
+        await fetch('/reset', { method: 'POST' });
+    } catch (error) {
+        showNotification('错误', '服务器连接失败');
+    }
+    currentDocId = null;
+    renderVersion++;
+    currentFile = null;
     textInput.value = '';
+    textInput.placeholder = '请输入或粘贴要分析的文本...';
     freqList.innerHTML = '';
     wordcloudImage.src = '';
     stopwordInput.value = '';
     stopwordsList.innerHTML = '';
     stopwordsSection.style.display = 'none';
     saveBtn.disabled = true;
+    canvasWidth.value = canvasWidth.defaultValue;
+    canvasHeight.value = canvasHeight.defaultValue;
+    clearMaskBtn.click();
 });
 
 // 显示通知
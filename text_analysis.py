@@ -0,0 +1,419 @@
+# 文本分析引擎：分词、过滤与词频统计（Web版与桌面版共用）
+import codecs
+import heapq
+import itertools
+import multiprocessing
+import os
+import re
+import string
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import jieba
+
+from tokenizer import get_tokenizer, is_self_parallel, load_user_dict
+
+# 停用词列表
+STOPWORDS = frozenset([
+    # 标点符号
+    '，', '。', '！', '？', '、', '；', '：', '"', '"', ''', ''', '（', '）',
+    '【', '】', '《', '》', '〈', '〉', '…', '—', '～', '@', '#', '￥', '%',
+    # 英文标点
+    *list(string.punctuation),
+    # 常见语气词和虚词
+    '啊', '哎', '哎呀', '哎哟', '唉', '嗯', '呢', '吧', '啦', '呀', '哦', '噢',
+    '的', '了', '着', '呢', '吧', '啊', '啦', '呀', '哦', '噢', '嘛', '吗',
+    '都', '就', '而', '而且', '但是', '但', '却', '呢', '吧', '啊', '啦',
+    '这', '那', '这个', '那个', '这些', '那些',
+    '什么', '谁', '哪', '哪个', '哪些', '怎么', '怎么样', '怎样', '为什么',
+    '是', '不是', '没', '没有', '不', '不要', '得', '地', '的'
+])
+
+# 文本长度（字符数）达到该阈值时启用多进程分词，低于阈值保持单线程
+PARALLEL_THRESHOLD = int(os.environ.get('WORDCLOUD_PARALLEL_THRESHOLD', 1_000_000))
+
+# 多进程分词时每个分块的目标字符数
+CHUNK_SIZE = 200_000
+
+# 分词进程数，默认与CPU核数相同
+WORKERS = int(os.environ.get('WORDCLOUD_WORKERS', os.cpu_count() or 1))
+
+# 可安全切分的句子边界；这些字符都不属于 jieba 的汉字/字母数字块，
+# 在其后切分不会改变分词结果
+SENTENCE_MARKS = '。！？!?'
+_BOUNDARY_RE = re.compile(r'[\n。！？!?]')
+
+# 没有段落与句子边界时的备用切分位置：空白与逗号等标点同样不属于 jieba 的
+# 汉字/字母数字块（不含 \r，避免把 \r\n 分开）
+WEAK_MARKS = ' \t\u3000，、；：,;'
+
+# 单线程分词报告进度时的分块份数
+PROGRESS_STEPS = 20
+
+# 流式读取文件时每次读取的字节数
+READ_CHUNK_SIZE = 64 * 1024
+
+# 流式分词时每批文本的目标字符数（批次在整行处切分）
+STREAM_BATCH_SIZE = 256 * 1024
+
+# 完全没有可切分位置时，文本超过批次大小的该倍数后强制切分，保证内存有界
+MAX_BATCH_FACTOR = 4
+
+_NON_ASCII_RE = re.compile(rb'[\x80-\xff]')
+
+# jieba 前缀词典缓存目录。jieba 默认写到系统临时目录，可能被定期清理，
+# 放到固定目录后只在首次运行时构建一次词典
+CACHE_DIR = os.environ.get(
+    'WORDCLOUD_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'wordcloud_app')
+)
+
+# 分词进程池（首次使用时创建）
+_pool = None
+_pool_lock = threading.Lock()
+
+def _configure_jieba_cache():
+    """把 jieba 词典缓存放到 CACHE_DIR，目录不可写时沿用默认的临时目录"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+    except OSError:
+        return
+    jieba.dt.tmp_dir = CACHE_DIR
+
+
+_configure_jieba_cache()
+
+
+def warm_up():
+    """在后台线程中加载 jieba 词典，使第一次分词不必等待词典构建
+
+    启动时调用；预热期间发起的分词会等待预热完成，不会重复加载。
+    """
+    def load():
+        jieba.initialize()
+        load_user_dict()
+
+    thread = threading.Thread(target=load, name='jieba-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def build_stopwords(custom_stopwords=()):
+    """合并内置停用词与自定义停用词，返回不可变集合"""
+    if not custom_stopwords:
+        return STOPWORDS
+    return STOPWORDS | frozenset(custom_stopwords)
+
+
+def is_valid_word(word, stopwords=STOPWORDS):
+    """判断单个词语是否计入词频"""
+    return (
+        word not in stopwords and                 # 不在停用词列表中
+        len(word.strip()) > 1 and                 # 长度大于1（同时排除了空白字符）
+        not (word.isdigit() and word.isascii())   # 不是纯数字，等价于 ^[0-9]+$
+    )
+
+
+def split_chunks(text, chunk_size=CHUNK_SIZE):
+    """在段落或句子边界处把文本切分为约 chunk_size 字符的块"""
+    chunks = []
+    start = 0
+    length = len(text)
+    while length - start > chunk_size:
+        end = start + chunk_size
+        # 优先在段落边界切分，其次是句子边界
+        cut = text.rfind('\n', start, end)
+        if cut < 0:
+            cut = max(text.rfind(mark, start, end) for mark in SENTENCE_MARKS)
+        if cut < 0:
+            # 窗口内没有边界，向后寻找下一个边界
+            match = _BOUNDARY_RE.search(text, end)
+            if match is None:
+                break
+            cut = match.start()
+        chunks.append(text[start:cut + 1])
+        start = cut + 1
+    if start < length:
+        chunks.append(text[start:])
+    return chunks
+
+
+def _last_boundary(text):
+    """返回最后一个切分边界之后的位置，没有边界时返回 0
+
+    优先段落，其次句子，都没有时（如没有换行与句末标点的长文本）取空白与逗号等标点。
+    """
+    cut = text.rfind('\n')
+    if cut < 0:
+        cut = max(text.rfind(mark) for mark in SENTENCE_MARKS)
+    if cut < 0:
+        cut = max(text.rfind(mark) for mark in WEAK_MARKS)
+    return cut + 1
+
+
+def detect_encoding(data, sample_size=READ_CHUNK_SIZE):
+    """根据字节内容判断文本编码：UTF-8（可带BOM）或 GBK
+
+    ASCII 字节在两种编码下相同，从第一个非 ASCII 字节起取 sample_size 字节判断，
+    开头有大段英文或代码的 GBK 文本也能正确识别；全部是 ASCII 时按 UTF-8。
+    """
+    if data.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    match = _NON_ASCII_RE.search(data)
+    if match is None:
+        return 'utf-8'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(
+            data[match.start():match.start() + sample_size], final=False
+        )
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gbk'
+
+
+def iter_text_batches(byte_chunks, encoding=None, batch_size=STREAM_BATCH_SIZE):
+    """把字节块流增量解码为在段落/句子边界处切分的文本批次
+
+    encoding 为 None 时自动判断 UTF-8 或 GBK：开头的纯 ASCII 字节块直接解码，
+    从第一个含非 ASCII 字节的块起暂存至少 READ_CHUNK_SIZE 字节再判断。任何时刻
+    只保留约一个批次的文本，内存占用与输入大小无关。
+    """
+    decoder = codecs.getincrementaldecoder(encoding)('replace') if encoding else None
+    pending = b''
+    buffer = ''
+    for chunk in byte_chunks:
+        if decoder is not None:
+            buffer += decoder.decode(chunk)
+        elif not pending and chunk.isascii():
+            buffer += chunk.decode('ascii')
+        else:
+            pending += chunk
+            if len(pending) < READ_CHUNK_SIZE:
+                continue
+            decoder = codecs.getincrementaldecoder(detect_encoding(pending))('replace')
+            buffer += decoder.decode(pending)
+            pending = b''
+        if len(buffer) >= batch_size:
+            cut = _last_boundary(buffer)
+            if not cut and len(buffer) >= MAX_BATCH_FACTOR * batch_size:
+                # 完全没有可切分的位置，强制切分（可能切断一个词）
+                cut = batch_size
+            if cut:
+                yield buffer[:cut]
+                buffer = buffer[cut:]
+    if pending:
+        decoder = codecs.getincrementaldecoder(detect_encoding(pending))('replace')
+        buffer += decoder.decode(pending)
+    if decoder is not None:
+        buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield buffer
+
+
+def iter_file_chunks(file, chunk_size=READ_CHUNK_SIZE):
+    """按固定大小读取二进制文件对象"""
+    return iter(lambda: file.read(chunk_size), b'')
+
+
+def _init_worker():
+    """分词进程初始化：每个进程只加载一次 jieba 词典与用户词典"""
+    jieba.initialize()
+    load_user_dict()
+
+
+def _count_chunk(tokenizer, chunk):
+    """在分词进程中统计一个分块"""
+    return Counter(get_tokenizer(tokenizer)(chunk))
+
+
+def _get_pool():
+    """获取（必要时创建）分词进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+        return _pool
+
+
+def count_tokens(text, parallel=None, progress=None, tokenizer=None):
+    """分词并统计所有词语出现次数（不过滤）
+
+    分词器的生成器直接交给 Counter 消费，不生成中间列表；tokenizer 为分词后端
+    名称（见 tokenizer.TOKENIZERS），默认使用 WORDCLOUD_TOKENIZER。
+    parallel 为 None 时按 PARALLEL_THRESHOLD 自动选择：大文本按段落/句子边界
+    分块后交给进程池分词，再按分块顺序合并，结果与单线程完全一致。
+    提供 progress 时每完成一个分块调用 progress(已完成块数, 总块数)，
+    单线程模式也会按分块处理以便报告进度。自行并行的后端不再使用进程池。
+    """
+    cut = get_tokenizer(tokenizer)
+    if is_self_parallel(tokenizer):
+        parallel = False
+    elif parallel is None:
+        parallel = len(text) >= PARALLEL_THRESHOLD and WORKERS > 1
+    if not parallel and progress is None:
+        return Counter(cut(text))
+
+    if parallel:
+        chunks = split_chunks(text)
+    else:
+        # 单线程报告进度时按约 PROGRESS_STEPS 份切分
+        chunks = split_chunks(text, max(len(text) // PROGRESS_STEPS, 1))
+    count_chunk = partial(_count_chunk, tokenizer)
+    partials = _get_pool().map(count_chunk, chunks) if parallel else map(count_chunk, chunks)
+    counts = Counter()
+    for done, chunk_counts in enumerate(partials, 1):
+        counts.update(chunk_counts)
+        if progress is not None:
+            progress(done, len(chunks))
+    return counts
+
+
+def count_stream(byte_chunks, encoding=None, tokenizer=None, parallel=None):
+    """从字节块流中边解码边分词，统计所有词语出现次数（不过滤）
+
+    在段落/句子边界处分批交给分词器，结果与一次性读入全文后分词一致。
+    parallel 为 None 时 WORKERS > 1 即启用：超过一个批次的输入把各批次交给
+    分词进程池，最多 2 * WORKERS 个批次同时在途，读取与分词并行，按批次顺序
+    合并；只有一个批次的小文件仍在当前线程分词。已在工作进程中运行的调用方
+    （如命令行的批量处理）应传入 False。
+    """
+    cut = get_tokenizer(tokenizer)
+    if is_self_parallel(tokenizer):
+        parallel = False
+    elif parallel is None:
+        parallel = WORKERS > 1
+    counts = Counter()
+    batches = iter_text_batches(byte_chunks, encoding)
+    if not parallel:
+        for batch in batches:
+            counts.update(cut(batch))
+        return counts
+
+    first = next(batches, None)
+    second = next(batches, None)
+    if second is None:
+        if first is not None:
+            counts.update(cut(first))
+        return counts
+
+    pool = _get_pool()
+    count_chunk = partial(_count_chunk, tokenizer)
+    pending = deque()
+    try:
+        for batch in itertools.chain((first, second), batches):
+            pending.append(pool.submit(count_chunk, batch))
+            if len(pending) >= 2 * WORKERS:
+                counts.update(pending.popleft().result())
+        while pending:
+            counts.update(pending.popleft().result())
+    finally:
+        # 读取失败（如上传超出大小限制）时取消尚未开始的批次
+        for future in pending:
+            future.cancel()
+    return counts
+
+
+class HeavyHitters:
+    """Misra-Gries 近似高频词统计：最多保留 capacity 个词语，内存有界
+
+    按批合并词频：合并后词语超过 capacity 个时，所有计数减去第 capacity+1 大
+    的计数并丢弃不再为正的词语。每个词语的估计次数不超过真实次数，且少计的
+    次数不超过 error_bound（始终 ≤ 总词数 / (capacity + 1)）；真实次数超过
+    error_bound 的词语一定被保留。
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError('capacity 必须为正整数')
+        self.capacity = capacity
+        self.counts = Counter()
+        self.total = 0          # 已统计的词语总数
+        self.error_bound = 0    # 累计扣减的次数，即每个词语少计次数的上界
+
+    def update(self, counts):
+        """合并一批词频（如一个文本批次的 Counter）"""
+        self.total += sum(counts.values())
+        self.counts.update(counts)
+        if len(self.counts) > self.capacity:
+            # 第 capacity+1 大的计数
+            threshold = heapq.nlargest(self.capacity + 1, self.counts.values())[-1]
+            self.counts = Counter({
+                word: count - threshold for word, count in self.counts.items() if count > threshold
+            })
+            self.error_bound += threshold
+
+    def top(self, n=10):
+        """返回前 n 个词语及其次数范围 [(词语, 估计次数, 次数上界)]"""
+        return [
+            (word, count, count + self.error_bound)
+            for word, count in heapq.nlargest(n, self.counts.items(), key=lambda item: item[1])
+        ]
+
+
+def count_stream_approx(byte_chunks, capacity, encoding=None, tokenizer=None):
+    """近似统计字节块流中的高频词，返回 HeavyHitters
+
+    用于无法精确计数的超大输入：每个文本批次先精确计数并按内置停用词过滤，
+    再合并到最多保留 capacity 个词语的摘要中，内存占用与输入大小无关。
+    """
+    cut = get_tokenizer(tokenizer)
+    heavy_hitters = HeavyHitters(capacity)
+    for batch in iter_text_batches(byte_chunks, encoding):
+        heavy_hitters.update(filter_counts(Counter(cut(batch))))
+    return heavy_hitters
+
+
+def filter_counts(token_counts, stopwords=STOPWORDS):
+    """按停用词与长度、数字规则过滤词频表
+
+    过滤只在去重后的词表上进行一次，代价与词表大小而不是词语总数成正比；
+    结果保持词语首次出现的顺序，与逐词过滤后再计数的结果完全一致。
+    """
+    return Counter({
+        word: count for word, count in token_counts.items() if is_valid_word(word, stopwords)
+    })
+
+
+class DocumentCounts:
+    """一次分词的结果：未过滤词频，以及当前停用词下的过滤结果
+
+    停用词变化时只需调整过滤结果，无需重新分词。同一文档由会话的多个请求共享，
+    切换停用词在锁内进行；过滤结果整体替换而不原地修改，已返回的词频在使用中
+    不会变化。
+    """
+
+    def __init__(self, token_counts, stopwords=STOPWORDS):
+        self.token_counts = token_counts
+        self.stopwords = stopwords
+        self.word_freq = filter_counts(token_counts, stopwords)
+        self._lock = threading.Lock()
+
+    def set_stopwords(self, stopwords):
+        """切换到新的停用词集合，返回更新后的过滤词频"""
+        with self._lock:
+            added = stopwords - self.stopwords
+            removed = self.stopwords - stopwords
+            if any(word in self.token_counts and is_valid_word(word, stopwords)
+                   for word in removed):
+                # 有词被恢复：重新过滤去重词表，保持与完整计算相同的词序
+                word_freq = filter_counts(self.token_counts, stopwords)
+            elif added & self.word_freq.keys():
+                # 只新增了停用词：在副本上扣除对应计数
+                word_freq = Counter(self.word_freq)
+                for word in added:
+                    word_freq.pop(word, None)
+            else:
+                word_freq = self.word_freq
+            self.stopwords, self.word_freq = stopwords, word_freq
+            return word_freq
+
+
+def count_words(text, custom_stopwords=(), tokenizer=None):
+    """分词、过滤并统计词频"""
+    token_counts = count_tokens(text, tokenizer=tokenizer)
+    return filter_counts(token_counts, build_stopwords(custom_stopwords))
@@ -0,0 +1,97 @@
+# 分词后端：jieba 精确模式（可关闭HMM）、jieba 并行模式与正则分词
+#
+# 不同后端在准确度与速度之间取舍，通过环境变量 WORDCLOUD_TOKENIZER 或命令行
+# --tokenizer 选择。用户词典在每个进程中只加载一次。
+import os
+import re
+import threading
+
+import jieba
+
+# 默认分词后端
+DEFAULT_TOKENIZER = os.environ.get('WORDCLOUD_TOKENIZER', 'jieba')
+
+# 用户词典路径（每行“词语 [词频] [词性]”），通过环境变量 WORDCLOUD_USER_DICT 指定
+USER_DICT = os.environ.get('WORDCLOUD_USER_DICT')
+
+# jieba 并行模式的进程数，默认与CPU核数相同
+JIEBA_PARALLEL_WORKERS = int(os.environ.get('WORDCLOUD_JIEBA_WORKERS', os.cpu_count() or 1))
+
+# 正则分词：连续的字母、数字（含汉字）为一个词，允许词内的撇号与连字符
+_WORD_RE = re.compile(r"[^\W_]+(?:['’-][^\W_]+)*")
+
+# 已加载的用户词典
+_loaded_dicts = set()
+_lock = threading.Lock()
+_parallel_enabled = False
+
+
+def load_user_dict(path=USER_DICT):
+    """加载 jieba 用户词典，同一词典在每个进程中只加载一次"""
+    if not path:
+        return
+    path = os.path.abspath(path)
+    with _lock:
+        if path in _loaded_dicts:
+            return
+        jieba.load_userdict(path)
+        _loaded_dicts.add(path)
+
+
+def _enable_jieba_parallel():
+    """开启 jieba 并行模式（只开启一次）
+
+    并行模式在开启时 fork 进程池，因此用户词典必须在此之前加载。
+    """
+    global _parallel_enabled
+    with _lock:
+        if _parallel_enabled:
+            return
+        if os.name == 'nt':
+            raise ValueError('jieba 并行模式只支持 POSIX 系统')
+        jieba.enable_parallel(JIEBA_PARALLEL_WORKERS)
+        _parallel_enabled = True
+
+
+def _cut_jieba(text):
+    return jieba.dt.cut(text)
+
+
+def _cut_jieba_no_hmm(text):
+    return jieba.dt.cut(text, HMM=False)
+
+
+def _cut_jieba_parallel(text):
+    # 开启并行模式后 jieba.cut 按行分发到进程池，其他后端使用的 jieba.dt.cut 不受影响
+    return jieba.cut(text)
+
+
+def _cut_regex(text):
+    return (match.group() for match in _WORD_RE.finditer(text))
+
+
+# 分词后端：名称 -> (分词函数, 说明, 是否自行并行)
+TOKENIZERS = {
+    'jieba': (_cut_jieba, "jieba 精确模式，HMM 识别未登录词（默认）", False),
+    'jieba-nohmm': (_cut_jieba_no_hmm, "jieba 精确模式，不使用 HMM，更快但不识别新词", False),
+    'jieba-parallel': (_cut_jieba_parallel, "jieba 并行模式（enable_parallel，按行多进程分词）", True),
+    'regex': (_cut_regex, "按空白与标点切分，适合英文为主的文本", False),
+}
+
+
+def get_tokenizer(name=None):
+    """返回分词函数 cut(text) -> 词语迭代器，并确保用户词典已加载"""
+    name = name or DEFAULT_TOKENIZER
+    if name not in TOKENIZERS:
+        raise ValueError(f"未知的分词后端：{name}（可选：{'、'.join(TOKENIZERS)}）")
+    cut, _, _ = TOKENIZERS[name]
+    if cut is not _cut_regex:
+        load_user_dict()
+    if cut is _cut_jieba_parallel:
+        _enable_jieba_parallel()
+    return cut
+
+
+def is_self_parallel(name=None):
+    """该后端是否自行多进程分词（此时不再交给分词进程池）"""
+    return TOKENIZERS[name or DEFAULT_TOKENIZER][2]
@@ -1,14 +1,21 @@
 # 系统库导入
+import os
+import queue
 import sys
+import threading
 import subprocess
-import pkg_resources
-import re
-import string
-from collections import Counter
+import time
+from importlib import metadata
+
+# 记录启动时间，用于报告冷启动耗时
+START_TIME = time.perf_counter()
 
 # 依赖检查函数
 def check_and_install_dependencies():
-    """检查并安装所需的依赖包"""
+    """检查并安装所需的依赖包
+
+    通过 importlib.metadata 读取已安装包的版本，不导入缓慢且已弃用的 pkg_resources。
+    """
     required_packages = {
         'jieba': '0.42.1',
         'wordcloud': '1.9.2',
@@ -27,10 +34,11 @@ def check_and_install_dependencies():
     all_installed = True
     for package, version in required_packages.items():
         try:
-            pkg_resources.require(f"{package}=={version}")
-        except (pkg_resources.DistributionNotFound, pkg_resources.VersionConflict):
-            if not install_package(package, version):
-                all_installed = False
+            installed = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            installed = None
+        if installed != version and not install_package(package, version):
+            all_installed = False
     
     if not all_installed:
         print("某些依赖包安装失败，请手动安装所需的包。")
@@ -48,9 +56,46 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
 # 第三方库导入
-from PIL import Image, ImageTk
-import jieba
-from wordcloud import WordCloud
+from PIL import ImageTk
+
+# 本地模块导入
+from text_analysis import (
+    build_stopwords, count_stream, count_tokens, detect_encoding, filter_counts,
+    iter_file_chunks, warm_up
+)
+from keyness import DEFAULT_METHOD, compare
+from wordcloud_render import (
+    DEFAULT_PRESET, MAX_CANVAS_SIDE, MAX_PANELS, MIN_CANVAS_SIDE, OUTPUT_FORMATS, RENDER_PARAMS,
+    canvas_params, encode_wordcloud, format_for_path, from_layout, preview_params,
+    render_side_by_side, render_wordcloud, save_scale, top_words
+)
+from metrics import finish_timings, record_size, start_timings, timed
+
+# 超过该大小（字节）的文件不载入文本框，生成时直接流式读取分词
+LARGE_FILE_SIZE = 1024 * 1024
+
+# 保存对话框中的文件类型：(说明, 输出格式)，编码预设由环境变量 WORDCLOUD_OUTPUT_PRESET 指定
+SAVE_TYPES = [
+    ("PNG 图片", 'png'),
+    ("调色板 PNG（体积更小）", 'png8'),
+    ("无损 WebP", 'webp'),
+    ("SVG 矢量图", 'svg')
+]
+
+# 对比文件时每个文件显示的关键词数量
+COMPARE_TOP = 30
+
+# 词云显示区域的最大尺寸，更大的画布缩小显示，保存时仍为完整尺寸
+DISPLAY_SIZE = (RENDER_PARAMS['width'], RENDER_PARAMS['height'])
+
+# 主线程检查后台生成结果的间隔（毫秒）
+POLL_INTERVAL = 100
+
+# 设置环境变量 WORDCLOUD_DEBUG=1 时在窗口底部显示各阶段耗时
+DEBUG = os.environ.get('WORDCLOUD_DEBUG', '') not in ('', '0')
+
+class GenerationCancelled(Exception):
+    """词云生成已被取消或被新的生成取代"""
 
 # 主应用类
 class WordCloudApp:
@@ -59,22 +104,6 @@ class WordCloudApp:
         self.root.title("词云统计应用")
         self.root.geometry("1200x800")
         
-        # 定义停用词列表
-        self.stopwords = set([
-            # 标点符号
-            '，', '。', '！', '？', '、', '；', '：', '"', '"', ''', ''', '（', '）', 
-            '【', '】', '《', '》', '〈', '〉', '…', '—', '～', '@', '#', '￥', '%',
-            # 英文标点
-            *list(string.punctuation),
-            # 常见语气词和虚词
-            '啊', '哎', '哎呀', '哎哟', '唉', '嗯', '呢', '吧', '啦', '呀', '哦', '噢',
-            '的', '了', '着', '呢', '吧', '啊', '啦', '呀', '哦', '噢', '嘛', '吗',
-            '都', '就', '而', '而且', '但是', '但', '却', '呢', '吧', '啊', '啦', 
-            '这', '那', '这个', '那个', '这些', '那些',
-            '什么', '谁', '哪', '哪个', '哪些', '怎么', '怎么样', '怎样', '为什么',
-            '是', '不是', '没', '没有', '不', '不要', '得', '地', '的'
-        ])
-        
         # 创建主框架
         self.main_frame = ttk.Frame(self.root, padding="10")
         self.main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -133,6 +162,30 @@ class WordCloudApp:
         self.reset_btn = ttk.Button(button_frame, text="初始化", command=self.reset_app)
         self.reset_btn.grid(row=0, column=3, padx=5)
         
+        self.compare_btn = ttk.Button(button_frame, text="对比文件", command=self.compare_files)
+        self.compare_btn.grid(row=0, column=4, padx=5)
+        
+        # 生成进度区域（生成过程中显示）
+        self.progress_frame = ttk.Frame(input_frame)
+        self.progress_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        
+        self.progress_var = tk.DoubleVar()
+        self.progress_bar = ttk.Progressbar(
+            self.progress_frame,
+            variable=self.progress_var,
+            maximum=100
+        )
+        self.progress_bar.grid(row=0, column=0, padx=5, sticky=(tk.W, tk.E))
+        
+        self.progress_label = ttk.Label(self.progress_frame, width=16)
+        self.progress_label.grid(row=0, column=1, padx=5)
+        
+        self.cancel_btn = ttk.Button(self.progress_frame, text="取消", command=self.cancel_generation)
+        self.cancel_btn.grid(row=0, column=2, padx=5)
+        
+        self.progress_frame.columnconfigure(0, weight=1)
+        self.progress_frame.grid_remove()  # 初始隐藏
+        
         # 词频统计显示区域
         freq_display_frame = ttk.LabelFrame(self.left_v_paned, text="词频统计", padding="5")
         
@@ -222,6 +275,29 @@ class WordCloudApp:
         self.image_label = ttk.Label(wordcloud_frame)
         self.image_label.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # 画布尺寸与遮罩
+        canvas_frame = ttk.Frame(wordcloud_frame)
+        canvas_frame.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        
+        ttk.Label(canvas_frame, text="画布：").grid(row=0, column=0)
+        self.width_var = tk.StringVar(value=str(RENDER_PARAMS['width']))
+        ttk.Spinbox(
+            canvas_frame, textvariable=self.width_var, width=6, increment=100,
+            from_=MIN_CANVAS_SIDE, to=MAX_CANVAS_SIDE
+        ).grid(row=0, column=1)
+        ttk.Label(canvas_frame, text="×").grid(row=0, column=2, padx=2)
+        self.height_var = tk.StringVar(value=str(RENDER_PARAMS['height']))
+        ttk.Spinbox(
+            canvas_frame, textvariable=self.height_var, width=6, increment=100,
+            from_=MIN_CANVAS_SIDE, to=MAX_CANVAS_SIDE
+        ).grid(row=0, column=3)
+        
+        self.mask_btn = ttk.Button(canvas_frame, text="选择遮罩", command=self.choose_mask)
+        self.mask_btn.grid(row=0, column=4, padx=(10, 5))
+        self.clear_mask_btn = ttk.Button(canvas_frame, text="清除遮罩", command=self.clear_mask)
+        self.clear_mask_btn.grid(row=0, column=5)
+        self.clear_mask_btn.grid_remove()
+        
         # 配置wordcloud_frame的网格权重
         wordcloud_frame.columnconfigure(0, weight=1)
         wordcloud_frame.rowconfigure(0, weight=1)
@@ -229,6 +305,11 @@ class WordCloudApp:
         # 添加到右侧垂直分割
         self.right_v_paned.add(wordcloud_frame, weight=2)
         
+        # 调试状态栏：显示最近一次生成的各阶段耗时与输入规模
+        self.debug_label = ttk.Label(self.main_frame, foreground='gray')
+        if DEBUG:
+            self.debug_label.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        
         # 配置主窗口和主框架的权重
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
@@ -239,6 +320,14 @@ class WordCloudApp:
         self.current_wordcloud = None
         self.word_frequencies = None
         self.custom_stopwords = set()
+        self.imported_file = None  # 以流式方式导入的大文件路径
+        self.mask_path = None  # 遮罩图片路径
+        
+        # 后台生成状态：每次生成递增编号，旧编号的结果直接丢弃
+        self.generation = 0
+        self.cancel_event = None  # 进行中的生成的取消标志，空闲时为 None
+        self.results = queue.Queue()
+        self.polling = False
     
     def validate_number(self, value):
         """验证输入是否为有效的数字或无穷大符号"""
@@ -268,10 +357,21 @@ class WordCloudApp:
         )
         if file_path:
             try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    self.text_input.delete('1.0', tk.END)
-                    self.text_input.insert('1.0', content)
+                size = os.path.getsize(file_path)
+                self.text_input.delete('1.0', tk.END)
+                if size > LARGE_FILE_SIZE:
+                    # 大文件只记录路径，生成词云时流式读取，避免整体载入内存和文本框
+                    self.imported_file = file_path
+                    self.text_label.configure(
+                        text=f"已导入大文件：{os.path.basename(file_path)}"
+                             f"（{size / 1024 / 1024:.1f} MB），点击“生成词云”直接分析"
+                    )
+                    return
+                with open(file_path, 'rb') as file:
+                    data = file.read()
+                self.imported_file = None
+                self.text_label.configure(text="请输入或粘贴文本：")
+                self.text_input.insert('1.0', data.decode(detect_encoding(data), 'replace'))
             except Exception as e:
                 messagebox.showerror("错误", f"无法读取文件：{str(e)}")
     
@@ -298,34 +398,220 @@ class WordCloudApp:
         else:
             messagebox.showwarning("警告", "请先选择要删除的停用词")
     
-    def filter_words(self, words):
-        """过滤停用词和无效字符"""
-        return [word for word in words if (
-            word not in self.stopwords and  # 不在默认停用词列表中
-            word not in self.custom_stopwords and  # 不在自定义停用词列表中
-            len(word.strip()) > 1 and       # 长度大于1
-            not word.isspace() and          # 不是空白字符
-            not re.match(r'^[0-9]+$', word) # 不是纯数字
-        )]
-    
     def generate_wordcloud(self):
+        """在后台线程中生成词云，主线程通过 root.after 轮询结果"""
         text = self.text_input.get('1.0', tk.END).strip()
-        if not text:
+        if not text and self.imported_file is None:
             messagebox.showwarning("警告", "请输入文本内容")
             return
-            
-        # 使用jieba分词并过滤停用词
-        words = list(jieba.cut(text))
-        filtered_words = self.filter_words(words)
         
-        # 统计词频
-        word_freq = Counter(filtered_words)
+        try:
+            params = canvas_params(self.width_var.get(), self.height_var.get(), self.mask_path)
+        except ValueError as e:
+            messagebox.showwarning("警告", str(e))
+            return
+        
+        self._start_worker(
+            self._generate_worker,
+            text,
+            self.imported_file,
+            build_stopwords(self.custom_stopwords),
+            params
+        )
+    
+    def compare_files(self):
+        """选择多个文本文件，在后台计算各文件的区分性关键词并生成并排词云"""
+        file_paths = filedialog.askopenfilenames(
+            filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")]
+        )
+        if not file_paths:
+            return
+        if len(file_paths) < 2:
+            messagebox.showwarning("警告", "请至少选择两个文件")
+            return
+        if len(file_paths) > MAX_PANELS:
+            messagebox.showwarning("警告", f"并排词云最多对比 {MAX_PANELS} 个文件")
+            return
+        
+        try:
+            params = canvas_params(self.width_var.get(), self.height_var.get())
+        except ValueError as e:
+            messagebox.showwarning("警告", str(e))
+            return
+        
+        self._start_worker(
+            self._compare_worker, list(file_paths), build_stopwords(self.custom_stopwords), params
+        )
+    
+    def _start_worker(self, target, *args):
+        """启动后台生成线程，并开始轮询其结果"""
+        # 取消仍在进行的生成，它的结果会因编号过期而被丢弃
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.generation += 1
+        self.cancel_event = threading.Event()
+        
+        worker = threading.Thread(
+            target=target,
+            args=(self.generation, self.cancel_event, *args),
+            daemon=True
+        )
+        self._show_progress("分词统计", 0)
+        worker.start()
+        
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_INTERVAL, self._poll_results)
+    
+    def _compare_worker(self, generation, cancel_event, file_paths, stopwords, params):
+        """后台线程：逐个文件分词计数，计算区分性关键词并生成并排词云"""
+        def report(stage, percent):
+            if cancel_event.is_set():
+                raise GenerationCancelled()
+            self.results.put(('progress', generation, stage, percent))
+        
+        start_timings()
+        try:
+            documents = []
+            for index, path in enumerate(file_paths):
+                report("分词统计", 70 * index / len(file_paths))
+                with timed('segment'), open(path, 'rb') as file:
+                    token_counts = count_stream(iter_file_chunks(file))
+                with timed('filter'):
+                    documents.append(filter_counts(token_counts, stopwords))
+            
+            report("计算关键词", 70)
+            with timed('score'):
+                _, keywords = compare(documents, DEFAULT_METHOD, COMPARE_TOP)
+            
+            report("生成词云", 75)
+            with timed('layout'):
+                layout, params = render_side_by_side([dict(words) for words in keywords], params)
+            with timed('draw'):
+                image = from_layout(layout, params).to_image()
+            self.results.put(('timings', generation, finish_timings().summary()))
+            names = [os.path.basename(path) for path in file_paths]
+            self.results.put(('compare', generation, names, keywords, layout, params, image))
+        except GenerationCancelled:
+            self.results.put(('cancelled', generation))
+        except Exception as e:
+            self.results.put(('error', generation, str(e)))
+    
+    def _generate_worker(self, generation, cancel_event, text, file_path, stopwords, params):
+        """后台线程：分词、过滤、先生成快速预览再正式渲染，通过队列把进度和结果发回主线程
+
+        不访问任何 tkinter 控件。
+        """
+        def report(stage, percent):
+            if cancel_event.is_set():
+                raise GenerationCancelled()
+            self.results.put(('progress', generation, stage, percent))
+        
+        start_timings()
+        try:
+            # 分词阶段占总进度的 0-70%
+            with timed('segment'):
+                if text:
+                    token_counts = count_tokens(
+                        text, progress=lambda done, total: report("分词统计", 70 * done / total)
+                    )
+                else:
+                    # 文本框为空时使用导入的大文件，边读取边分词
+                    size = os.path.getsize(file_path) or 1
+                    with open(file_path, 'rb') as file:
+                        def read_chunks():
+                            for chunk in iter_file_chunks(file):
+                                report("分词统计", 70 * file.tell() / size)
+                                yield chunk
+                        token_counts = count_stream(read_chunks())
+            record_size(len(text) if text else None, sum(token_counts.values()))
+            with timed('filter'):
+                word_freq = filter_counts(token_counts, stopwords)
+            
+            # 先在小画布上快速布局并放大显示，再进行正式渲染
+            report("生成预览", 70)
+            preview_config = preview_params(params)
+            with timed('preview'):
+                preview = render_wordcloud(
+                    dict(top_words(word_freq, params['max_words'])), preview_config
+                )
+                preview_image = preview.to_image()
+            self.results.put((
+                'preview', generation, word_freq, preview.layout_, preview_config, preview_image
+            ))
+            
+            report("生成词云", 75)
+            with timed('layout'):
+                wordcloud = render_wordcloud(word_freq, params)
+            
+            # 默认画布下渲染尺寸即显示尺寸；保存时按布局绘制全分辨率图像
+            report("转换图像", 95)
+            with timed('draw'):
+                image = wordcloud.to_image()
+            self.results.put(('timings', generation, finish_timings().summary()))
+            self.results.put((
+                'done', generation, word_freq, wordcloud.layout_, params, image
+            ))
+        except GenerationCancelled:
+            self.results.put(('cancelled', generation))
+        except Exception as e:
+            self.results.put(('error', generation, str(e)))
+    
+    def _poll_results(self):
+        """在主线程中处理后台线程发回的进度与结果"""
+        while True:
+            try:
+                message = self.results.get_nowait()
+            except queue.Empty:
+                break
+            kind, generation = message[0], message[1]
+            if generation != self.generation:
+                continue  # 已被新的生成取代或已取消，丢弃过期结果
+            if kind == 'progress':
+                self._show_progress(*message[2:])
+                continue
+            if kind == 'preview':
+                self._show_result(*message[2:], preview=True)
+                continue
+            if kind == 'timings':
+                self.debug_label.configure(text=message[2])
+                continue
+            
+            self.cancel_event = None
+            self._hide_progress()
+            if kind == 'done':
+                self._show_result(*message[2:])
+            elif kind == 'compare':
+                self._show_comparison(*message[2:])
+            elif kind == 'error':
+                messagebox.showerror("错误", f"生成词云失败：{message[2]}")
+        
+        if self.cancel_event is not None:
+            self.root.after(POLL_INTERVAL, self._poll_results)
+        else:
+            self.polling = False
+    
+    def _show_progress(self, stage, percent):
+        """显示生成进度"""
+        self.progress_var.set(percent)
+        self.progress_label.configure(text=f"{stage} {int(percent)}%")
+        self.progress_frame.grid()
+    
+    def _hide_progress(self):
+        """隐藏生成进度"""
+        self.progress_frame.grid_remove()
+        self.progress_var.set(0)
+    
+    def _show_result(self, word_freq, layout, params, image, preview=False):
+        """在主线程中显示生成结果（预览或正式渲染），预览的布局不用于保存"""
+        self.word_frequencies = word_freq
+        self.current_wordcloud = None if preview else (layout, params)
         
         # 更新词频显示
         self.freq_display.config(state=tk.NORMAL)
         self.freq_display.delete('1.0', tk.END)
         freq_text = "词频统计（前10个）：\n"
-        for word, freq in sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]:
+        for word, freq in top_words(word_freq):
             freq_text += f"{word}: {freq}次\n"
         self.freq_display.insert('1.0', freq_text)
         self.freq_display.config(state=tk.DISABLED)
@@ -334,47 +620,94 @@ class WordCloudApp:
         self.stopwords_frame.grid()
         self.right_v_paned.add(self.stopwords_frame, weight=1)
         
-        # 生成词云
-        wordcloud = WordCloud(
-            font_path="msyh.ttc",
-            width=600,
-            height=400,
-            background_color='white',
-            max_words=100,
-            min_font_size=10,
-            max_font_size=100
-        ).generate_from_frequencies(word_freq)
-        
-        # 转换为PIL图像
-        image = wordcloud.to_image()
-        self.current_wordcloud = image
-        
-        # 调整图像大小以适应显示
-        image = image.resize((600, 400), Image.Resampling.LANCZOS)
+        # 更新显示，超过显示区域的大画布缩小显示
+        if image.width > DISPLAY_SIZE[0] or image.height > DISPLAY_SIZE[1]:
+            image = image.copy()
+            image.thumbnail(DISPLAY_SIZE)
         photo = ImageTk.PhotoImage(image)
+        self.image_label.configure(image=photo)
+        self.image_label.image = photo
+    
+    def _show_comparison(self, names, keywords, layout, params, image):
+        """在主线程中显示各文件的区分性关键词与并排词云"""
+        self.word_frequencies = None
+        self.current_wordcloud = (layout, params)
+        
+        self.freq_display.config(state=tk.NORMAL)
+        self.freq_display.delete('1.0', tk.END)
+        lines = [f"区分性关键词（{DEFAULT_METHOD}，词云按文件顺序从左到右、从上到下排列）："]
+        for name, words in zip(names, keywords):
+            lines.append(f"{name}：" + '、'.join(word for word, _ in words[:10]))
+        self.freq_display.insert('1.0', '\n'.join(lines))
+        self.freq_display.config(state=tk.DISABLED)
         
-        # 更新显示
+        if image.width > DISPLAY_SIZE[0] or image.height > DISPLAY_SIZE[1]:
+            image.thumbnail(DISPLAY_SIZE)
+        photo = ImageTk.PhotoImage(image)
         self.image_label.configure(image=photo)
         self.image_label.image = photo
     
+    def choose_mask(self):
+        """选择遮罩图片，词语只排布在图片的非白色区域"""
+        file_path = filedialog.askopenfilename(
+            filetypes=[("图片文件", "*.png *.jpg *.jpeg *.bmp *.gif *.webp"), ("All Files", "*.*")]
+        )
+        if file_path:
+            self.mask_path = file_path
+            self.mask_btn.configure(text=f"遮罩：{os.path.basename(file_path)}")
+            self.clear_mask_btn.grid()
+    
+    def clear_mask(self):
+        """清除遮罩"""
+        self.mask_path = None
+        self.mask_btn.configure(text="选择遮罩")
+        self.clear_mask_btn.grid_remove()
+    
+    def cancel_generation(self):
+        """取消进行中的词云生成"""
+        if self.cancel_event is None:
+            return
+        self.cancel_event.set()
+        self.cancel_event = None
+        self.generation += 1
+        self._hide_progress()
+    
     def save_image(self):
         if self.current_wordcloud is None:
-            messagebox.showwarning("警告", "请先生成词云")
+            if self.cancel_event is not None:
+                messagebox.showwarning("警告", "正在生成正式词云，请完成后再保存")
+            else:
+                messagebox.showwarning("警告", "请先生成词云")
             return
             
+        type_var = tk.StringVar(value=SAVE_TYPES[0][0])
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG Files", "*.png")]
+            filetypes=[(label, f"*.{OUTPUT_FORMATS[fmt][1]}") for label, fmt in SAVE_TYPES],
+            typevariable=type_var
         )
         if file_path:
             try:
-                self.current_wordcloud.save(file_path)
+                # 以选择的文件类型为准；手动输入了其他格式的扩展名时按扩展名保存
+                output_format = dict(SAVE_TYPES).get(type_var.get(), 'png')
+                by_extension = format_for_path(file_path, None)
+                if by_extension and OUTPUT_FORMATS[output_format][1] != OUTPUT_FORMATS[by_extension][1]:
+                    output_format = by_extension
+                layout, params = self.current_wordcloud
+                data = encode_wordcloud(
+                    from_layout(layout, params, save_scale(params)), output_format, DEFAULT_PRESET
+                )
+                with open(file_path, 'wb') as file:
+                    file.write(data)
                 messagebox.showinfo("成功", "词云图片已保存")
             except Exception as e:
                 messagebox.showerror("错误", f"保存失败：{str(e)}")
     
     def reset_app(self):
         """初始化应用状态"""
+        # 取消进行中的生成
+        self.cancel_generation()
+        
         # 清空文本输入
         self.text_input.delete('1.0', tk.END)
         
@@ -395,15 +728,26 @@ class WordCloudApp:
         # 隐藏停用词区域
         self.stopwords_frame.grid_remove()
         
+        # 恢复默认画布
+        self.width_var.set(str(RENDER_PARAMS['width']))
+        self.height_var.set(str(RENDER_PARAMS['height']))
+        self.clear_mask()
+        
         # 重置变量
         self.word_frequencies = None
+        self.imported_file = None
+        self.text_label.configure(text="请输入或粘贴文本：")
         
         messagebox.showinfo("提示", "已重置所有内容")
 
 if __name__ == "__main__":
     try:
+        # 在后台加载 jieba 词典，与窗口创建同时进行
+        warm_up()
         root = tk.Tk()
         app = WordCloudApp(root)
+        root.update_idletasks()
+        print(f"启动耗时：{time.perf_counter() - START_TIME:.2f} 秒")
         root.mainloop()
     except Exception as e:
         print(f"程序运行出错：{str(e)}")
@@ -0,0 +1,468 @@
+# 命令行模式：无界面地为大量文本文件并行生成词云与词频表，并维护语料词频库
+#
+# 只依赖分词与渲染模块，不导入 tkinter 或 Flask，可在无显示环境的服务器上运行。
+#
+# 用法示例：
+#     python wordcloud_cli.py batch reports/ -o out/ --merged out/merged.csv
+#     python wordcloud_cli.py batch "logs/**/*.txt" -o out/ --format csv --workers 8
+#     python wordcloud_cli.py corpus ingest tickets "tickets/*.txt"
+#     python wordcloud_cli.py corpus cloud tickets --start 2024-05-01 -o may.png
+#     python wordcloud_cli.py corpus cloud tickets -o tickets.svg
+#     python wordcloud_cli.py corpus cloud tickets -o poster.png --width 3840 --height 2160 --mask logo.png
+#     python wordcloud_cli.py compare reports/ -o keywords.json --cloud side --cloud-output compare.png
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from functools import partial
+
+from text_analysis import (
+    build_stopwords, count_stream, count_stream_approx, filter_counts, iter_file_chunks
+)
+from freq_store import DEFAULT_PATH, FrequencyStore
+from keyness import DEFAULT_METHOD, METHODS, compare
+from tokenizer import DEFAULT_TOKENIZER, TOKENIZERS, load_user_dict
+from wordcloud_render import (
+    DEFAULT_PRESET, MAX_LAYOUT_PIXELS, MAX_PANELS, OUTPUT_FORMATS, OUTPUT_PRESETS, encode_wordcloud,
+    format_for_path, from_layout, render_contrast, render_params, render_side_by_side,
+    render_wordcloud, top_words
+)
+
+
+def collect_files(inputs, pattern='*.txt', recursive=False):
+    """展开输入的目录、通配符与文件，返回 [(文件路径, 输出相对路径)]"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            root = item
+            paths = glob.glob(os.path.join(item, '**', pattern) if recursive
+                              else os.path.join(item, pattern), recursive=recursive)
+        else:
+            root = None
+            paths = glob.glob(item, recursive=True) or [item]
+        for path in sorted(paths):
+            if os.path.isfile(path):
+                relative = os.path.relpath(path, root) if root else os.path.basename(path)
+                files.append((path, relative))
+    return files
+
+
+def load_stopwords(stopword_files, extra_words):
+    """读取停用词文件（每行一个词）并合并命令行指定的停用词"""
+    words = set(extra_words or ())
+    for path in stopword_files or ():
+        with open(path, 'r', encoding='utf-8') as file:
+            words.update(line.strip() for line in file if line.strip())
+    return build_stopwords(words)
+
+
+def write_table(path, frequencies, table_format):
+    """写出词频表（JSON 或 CSV）"""
+    if table_format == 'json':
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(dict(frequencies), file, ensure_ascii=False, indent=1)
+    else:
+        with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['word', 'count'])
+            writer.writerows(frequencies)
+
+
+def process_file(path, output_base, stopwords, params, options):
+    """处理单个文件：流式分词计数、写出词云图片与词频表
+
+    在工作进程中运行；返回 (结果, 误差上界)：需要合并语料词频时结果为过滤后的
+    词频，否则为词表大小。近似计数时误差上界为每个词语可能少计的次数，精确计数时为 0。
+    """
+    load_user_dict(options['user_dict'])
+    error_bound = 0
+    with open(path, 'rb') as file:
+        chunks = iter_file_chunks(file)
+        if options['approx']:
+            heavy_hitters = count_stream_approx(
+                chunks, options['approx'], options['encoding'], options['tokenizer']
+            )
+            token_counts, error_bound = heavy_hitters.counts, heavy_hitters.error_bound
+        else:
+            token_counts = count_stream(
+                chunks, options['encoding'], options['tokenizer'], parallel=False
+            )
+    word_freq = filter_counts(token_counts, stopwords)
+
+    os.makedirs(os.path.dirname(output_base) or '.', exist_ok=True)
+    write_table(
+        f"{output_base}.{options['format']}",
+        top_words(word_freq, options['top'] or len(word_freq)),
+        options['format']
+    )
+    if not options['no_image']:
+        if not word_freq:
+            raise ValueError("没有可用于生成词云的词语")
+        image_format = options['image_format']
+        wordcloud = render_wordcloud(word_freq, params)
+        with open(f"{output_base}.{OUTPUT_FORMATS[image_format][1]}", 'wb') as file:
+            file.write(encode_wordcloud(wordcloud, image_format, options['preset']))
+
+    return (word_freq if options['merged'] else len(word_freq)), error_bound
+
+
+def render_params_from_args(args):
+    """由命令行选项生成渲染参数"""
+    return render_params(
+        args.max_layout_pixels,
+        mask=args.mask,
+        font_path=args.font,
+        width=args.width,
+        height=args.height,
+        background_color=args.background_color,
+        max_words=args.max_words,
+        min_font_size=args.min_font_size,
+        max_font_size=args.max_font_size
+    )
+
+
+def run_batch(args):
+    """batch 子命令：并行处理所有输入文件"""
+    files = collect_files(args.inputs, args.pattern, args.recursive)
+    if not files:
+        print("没有找到要处理的文件", file=sys.stderr)
+        return 1
+
+    stopwords = load_stopwords(args.stopwords, args.stopword)
+    params = render_params_from_args(args)
+    options = {
+        'encoding': args.encoding,
+        'tokenizer': args.tokenizer,
+        'user_dict': args.user_dict,
+        'approx': args.approx,
+        'format': args.format,
+        'image_format': args.image_format or 'png',
+        'preset': args.preset,
+        'top': args.top,
+        'no_image': args.no_image,
+        'merged': bool(args.merged)
+    }
+
+    merged = Counter()
+    merged_error = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(
+                process_file,
+                path,
+                os.path.join(args.output, os.path.splitext(relative)[0]),
+                stopwords,
+                params,
+                options
+            ): path
+            for path, relative in files
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                result, error_bound = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(files)}] 失败 {path}：{e}", file=sys.stderr)
+                continue
+            if options['merged']:
+                merged.update(result)
+                merged_error += error_bound
+                result = len(result)
+            note = f"，近似计数，每词最多少计 {error_bound} 次" if error_bound else ""
+            print(f"[{done}/{len(files)}] 完成 {path}（{result} 个词{note}）")
+
+    if options['merged']:
+        merged_format = 'json' if args.merged.endswith('.json') else 'csv'
+        os.makedirs(os.path.dirname(args.merged) or '.', exist_ok=True)
+        write_table(args.merged, top_words(merged, args.top or len(merged)), merged_format)
+        print(f"语料合并词频表已写入 {args.merged}")
+        if merged_error:
+            print(f"合并词频为近似计数，每个词最多少计 {merged_error} 次")
+
+    print(f"共处理 {len(files)} 个文件，失败 {failed} 个")
+    return 1 if failed else 0
+
+
+def count_file(path, stopwords, encoding, tokenizer, user_dict):
+    """流式分词计数单个文件并按停用词过滤（在工作进程中运行）"""
+    load_user_dict(user_dict)
+    with open(path, 'rb') as file:
+        return filter_counts(
+            count_stream(iter_file_chunks(file), encoding, tokenizer, parallel=False), stopwords
+        )
+
+
+def run_compare(args):
+    """compare 子命令：对比多个文件，输出每个文件的区分性关键词并可生成词云"""
+    files = collect_files(args.inputs, args.pattern, args.recursive)
+    if len(files) < 2:
+        print("至少需要两个文件才能对比", file=sys.stderr)
+        return 1
+    if args.top < 1:
+        print("关键词数量必须为正整数", file=sys.stderr)
+        return 1
+    if args.cloud_output and args.cloud == 'side' and len(files) > MAX_PANELS:
+        print(f"并排词云最多 {MAX_PANELS} 个文件，请减少文件或使用 --cloud contrast", file=sys.stderr)
+        return 1
+    names = [relative for _, relative in files]
+    if args.target in names:
+        target = names.index(args.target)
+    elif args.target.isdigit() and int(args.target) < len(files):
+        target = int(args.target)
+    else:
+        print(f"对比目标不存在：{args.target}", file=sys.stderr)
+        return 1
+
+    stopwords = load_stopwords(args.stopwords, args.stopword)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        documents = list(executor.map(
+            partial(count_file, stopwords=stopwords, encoding=args.encoding,
+                    tokenizer=args.tokenizer, user_dict=args.user_dict),
+            [path for path, _ in files]
+        ))
+    try:
+        matrix, keywords = compare(documents, args.method, args.top)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"共 {len(files)} 个文件，词表 {len(matrix.words)} 个词（{args.method}）")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(dict(zip(names, keywords)), file, ensure_ascii=False, indent=1)
+        print(f"关键词已写入 {args.output}")
+    else:
+        for name, words in zip(names, keywords):
+            print(f"{name}\t" + ' '.join(f"{word}({score:.2f})" for word, score in words))
+
+    if args.cloud_output:
+        params = render_params_from_args(args)
+        if args.cloud == 'side':
+            layout, params = render_side_by_side([dict(words) for words in keywords], params)
+            wordcloud = from_layout(layout, params)
+        else:
+            vector = matrix.log_odds_vector(target)
+            wordcloud = render_contrast(
+                dict(matrix.top_words(vector, args.top)), dict(matrix.top_words(-vector, args.top)),
+                params
+            )
+        image_format = args.image_format or format_for_path(args.cloud_output)
+        with open(args.cloud_output, 'wb') as file:
+            file.write(encode_wordcloud(wordcloud, image_format, args.preset))
+        print(f"对比词云已写入 {args.cloud_output}")
+    return 0
+
+
+def corpus_ingest(store, args):
+    """把文件逐个导入语料，日期默认取文件的修改日期"""
+    files = collect_files(args.inputs, args.pattern, args.recursive)
+    if not files:
+        print("没有找到要处理的文件", file=sys.stderr)
+        return 1
+
+    load_user_dict(args.user_dict)
+    added = 0
+    for path, _ in files:
+        with open(path, 'rb') as file:
+            digest = hashlib.sha256()
+
+            def read_chunks():
+                for chunk in iter_file_chunks(file):
+                    digest.update(chunk)
+                    yield chunk
+
+            # 分词进程只加载默认用户词典，指定了其他用户词典时在当前进程分词
+            token_counts = count_stream(
+                read_chunks(), args.encoding, args.tokenizer, parallel=not args.user_dict
+            )
+        day = args.date or date.fromtimestamp(os.path.getmtime(path))
+        if store.ingest(args.name, token_counts, day, digest.hexdigest()):
+            added += 1
+            print(f"已导入 {path}（{day}）")
+        else:
+            print(f"跳过已导入的 {path}")
+    print(f"共导入 {added} 个文件到语料 {args.name}")
+    return 0
+
+
+def corpus_top(store, args):
+    """输出语料（或日期范围内）的高频词表"""
+    frequencies = store.counts(args.name, args.start, args.end, set(args.stopword or ()), args.top)
+    if args.output:
+        write_table(args.output, list(frequencies.items()), args.format)
+    else:
+        for word, count in frequencies.items():
+            print(f"{word}\t{count}")
+    return 0
+
+
+def corpus_cloud(store, args):
+    """由保存的词频生成语料（或日期范围内）的词云"""
+    params = render_params_from_args(args)
+    stopwords = load_stopwords(args.stopwords, args.stopword)
+    word_freq = store.counts(args.name, args.start, args.end, stopwords, params['max_words'])
+    if not word_freq:
+        print("该时间范围内没有词语", file=sys.stderr)
+        return 1
+    image_format = args.image_format or format_for_path(args.output)
+    with open(args.output, 'wb') as file:
+        file.write(encode_wordcloud(render_wordcloud(word_freq, params), image_format, args.preset))
+    print(f"词云已写入 {args.output}")
+    return 0
+
+
+def corpus_list(store, args):
+    """列出所有语料"""
+    for corpus in store.corpora():
+        print(f"{corpus['name']}\t{corpus['documents']} 篇\t{corpus['tokens']} 词\t"
+              f"{corpus['first_day'] or '-'} ~ {corpus['last_day'] or '-'}")
+    return 0
+
+
+def corpus_delete(store, args):
+    """删除语料"""
+    if not store.delete(args.name):
+        print(f"语料不存在：{args.name}", file=sys.stderr)
+        return 1
+    print(f"已删除语料 {args.name}")
+    return 0
+
+
+def run_corpus(args):
+    """corpus 子命令：维护语料词频库"""
+    try:
+        return args.action(FrequencyStore(args.db), args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+
+def add_tokenizer_arguments(parser):
+    """添加分词后端与用户词典选项"""
+    group = parser.add_argument_group("分词")
+    group.add_argument('--tokenizer', choices=list(TOKENIZERS), default=DEFAULT_TOKENIZER,
+                       help=f"分词后端（默认 {DEFAULT_TOKENIZER}，jieba-nohmm 更快，regex 适合英文为主的文本）")
+    group.add_argument('--user-dict', metavar='FILE', help="jieba 用户词典（每行“词语 [词频] [词性]”）")
+
+
+def add_render_arguments(parser):
+    """添加停用词与渲染参数选项"""
+    group = parser.add_argument_group("停用词与渲染参数")
+    group.add_argument('--stopwords', action='append', metavar='FILE', help="停用词文件，每行一个词，可重复指定")
+    group.add_argument('--stopword', action='append', metavar='WORD', help="额外的停用词，可重复指定")
+    group.add_argument('--font', help="字体文件路径（默认 msyh.ttc 或环境变量 WORDCLOUD_FONT）")
+    group.add_argument('--width', type=int, help="图像宽度（默认 600）")
+    group.add_argument('--height', type=int, help="图像高度（默认 400）")
+    group.add_argument('--background-color', help="背景颜色（默认 white）")
+    group.add_argument('--max-words', type=int, help="最多显示的词语数（默认 100）")
+    group.add_argument('--min-font-size', type=int, help="最小字号（默认 10）")
+    group.add_argument('--max-font-size', type=int, help="最大字号（默认 100）")
+    group.add_argument('--mask', metavar='FILE',
+                       help="遮罩图片，词语只排布在非白色区域（遮罩缩放到画布尺寸）")
+    group.add_argument('--max-layout-pixels', type=int, default=MAX_LAYOUT_PIXELS, metavar='N',
+                       help=f"超过该像素数的画布缩小后布局、放大绘制（默认 {MAX_LAYOUT_PIXELS}，0 表示不缩小）")
+    group.add_argument('--image-format', choices=list(OUTPUT_FORMATS),
+                       help="图片格式：png、png8（调色板）、webp（无损）、svg（默认 png，corpus cloud 按输出文件扩展名）")
+    group.add_argument('--preset', choices=OUTPUT_PRESETS, default=DEFAULT_PRESET,
+                       help=f"编码预设：fast 编码最快，small 体积最小（默认 {DEFAULT_PRESET}）")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="词云统计命令行工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    batch = subparsers.add_parser('batch', help="批量为文本文件生成词云与词频表")
+    batch.add_argument('inputs', nargs='+', help="输入文件、目录或通配符")
+    batch.add_argument('-o', '--output', required=True, help="输出目录")
+    batch.add_argument('--pattern', default='*.txt', help="目录中匹配的文件名模式（默认 *.txt）")
+    batch.add_argument('-r', '--recursive', action='store_true', help="递归处理子目录")
+    batch.add_argument('--encoding', help="文件编码（默认自动识别 UTF-8/GBK）")
+    batch.add_argument('--format', choices=('json', 'csv'), default='json', help="词频表格式（默认 json）")
+    batch.add_argument('--top', type=int, help="词频表只保留前 N 个词（默认全部）")
+    batch.add_argument('--merged', metavar='FILE', help="写出整个语料的合并词频表（.json 或 .csv）")
+    batch.add_argument('--no-image', action='store_true', help="只输出词频表，不生成词云图片")
+    batch.add_argument('--approx', type=int, metavar='K',
+                       help="近似统计高频词，每个文件最多保留 K 个词语，内存有界（用于超大文件）")
+    batch.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="并行进程数（默认CPU核数）")
+    add_tokenizer_arguments(batch)
+    add_render_arguments(batch)
+    batch.set_defaults(func=run_batch)
+
+    compare_parser = subparsers.add_parser('compare', help="对比多个文本文件，找出各文件的区分性关键词")
+    compare_parser.add_argument('inputs', nargs='+', help="输入文件、目录或通配符（至少两个文件）")
+    compare_parser.add_argument('--pattern', default='*.txt', help="目录中匹配的文件名模式（默认 *.txt）")
+    compare_parser.add_argument('-r', '--recursive', action='store_true', help="递归处理子目录")
+    compare_parser.add_argument('--encoding', help="文件编码（默认自动识别 UTF-8/GBK）")
+    compare_parser.add_argument('--method', choices=list(METHODS), default=DEFAULT_METHOD,
+                                help=f"关键词得分方法（默认 {DEFAULT_METHOD}）")
+    compare_parser.add_argument('-n', '--top', type=int, default=30, help="每个文件的关键词数量（默认 30）")
+    compare_parser.add_argument('-o', '--output', help="写出各文件关键词的 JSON 文件（默认打印到终端）")
+    compare_parser.add_argument('--cloud', choices=('side', 'contrast'), default='side',
+                                help="词云类型：side 各文件关键词并排，contrast 目标文件与其余文件对比")
+    compare_parser.add_argument('--cloud-output', metavar='FILE', help="写出对比词云图片")
+    compare_parser.add_argument('--target', default='0',
+                                help="contrast 词云的目标文件（序号或输出相对路径，默认第一个）")
+    compare_parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="并行进程数（默认CPU核数）")
+    add_tokenizer_arguments(compare_parser)
+    add_render_arguments(compare_parser)
+    compare_parser.set_defaults(func=run_compare)
+
+    corpus = subparsers.add_parser('corpus', help="语料词频库：导入文本并按语料或日期范围生成词云")
+    corpus.add_argument('--db', default=DEFAULT_PATH, help="词频库文件（默认环境变量 WORDCLOUD_FREQ_STORE）")
+    corpus.set_defaults(func=run_corpus)
+    actions = corpus.add_subparsers(dest='action_name', required=True)
+
+    ingest = actions.add_parser('ingest', help="把文本文件的词频累加到语料")
+    ingest.add_argument('name', help="语料名称")
+    ingest.add_argument('inputs', nargs='+', help="输入文件、目录或通配符")
+    ingest.add_argument('--date', help="文档日期 YYYY-MM-DD（默认取文件修改日期）")
+    ingest.add_argument('--pattern', default='*.txt', help="目录中匹配的文件名模式（默认 *.txt）")
+    ingest.add_argument('-r', '--recursive', action='store_true', help="递归处理子目录")
+    ingest.add_argument('--encoding', help="文件编码（默认自动识别 UTF-8/GBK）")
+    add_tokenizer_arguments(ingest)
+    ingest.set_defaults(action=corpus_ingest)
+
+    top = actions.add_parser('top', help="输出语料的高频词表")
+    top.add_argument('name', help="语料名称")
+    top.add_argument('-n', '--top', type=int, default=20, help="输出的词语数量（默认 20）")
+    top.add_argument('-o', '--output', help="写出词频表文件（默认打印到终端）")
+    top.add_argument('--format', choices=('json', 'csv'), default='csv', help="词频表格式（默认 csv）")
+    top.add_argument('--stopword', action='append', metavar='WORD', help="额外排除的词语，可重复指定")
+    top.set_defaults(action=corpus_top)
+
+    cloud = actions.add_parser('cloud', help="由保存的词频生成语料词云")
+    cloud.add_argument('name', help="语料名称")
+    cloud.add_argument('-o', '--output', required=True, help="输出图片文件（.png、.webp 或 .svg）")
+    add_render_arguments(cloud)
+    cloud.set_defaults(action=corpus_cloud)
+
+    for action in (top, cloud):
+        action.add_argument('--start', help="起始日期 YYYY-MM-DD（含）")
+        action.add_argument('--end', help="结束日期 YYYY-MM-DD（含）")
+
+    actions.add_parser('list', help="列出所有语料").set_defaults(action=corpus_list)
+
+    delete = actions.add_parser('delete', help="删除语料")
+    delete.add_argument('name', help="语料名称")
+    delete.set_defaults(action=corpus_delete)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'mask', None) and not os.path.isfile(args.mask):
+        parser.error(f"遮罩图片不存在：{args.mask}")
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,406 @@
+# 词云渲染：渲染参数、词云生成与图像编码（Web版、桌面版与命令行共用）
+#
+# wordcloud 库在布局时每尝试一个字号都会重新加载 TrueType 字体并重新测量文字，
+# 这里为其提供按 (字体, 字号) 缓存的字体对象和按 (词语, 字体, 方向) 缓存的文字
+# 尺寸，并为每组渲染参数保留一个配置好的 WordCloud 实例，跨请求复用。
+#
+# 渲染参数中的 mask 为遮罩图片路径，布局前按画布尺寸取缓存的预处理遮罩（见
+# masks.py），wordcloud 的积分图从缓存的初始积分图复制而来。
+import copy
+import heapq
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from operator import itemgetter
+from random import Random
+
+import wordcloud.wordcloud as wordcloud_module
+from PIL import Image, ImageDraw, ImageFont
+from wordcloud import WordCloud
+
+from masks import lookup_mask, prepare_mask
+
+# 默认字体，可通过环境变量 WORDCLOUD_FONT 指定其他中文字体
+DEFAULT_FONT = os.environ.get('WORDCLOUD_FONT', 'msyh.ttc')
+
+# 默认渲染参数
+RENDER_PARAMS = {
+    'font_path': DEFAULT_FONT,
+    'width': 600,
+    'height': 400,
+    'background_color': 'white',
+    'max_words': 100,
+    'min_font_size': 10,
+    'max_font_size': 100
+}
+
+# 画布的最小与最大边长（像素），最大边长可通过环境变量 WORDCLOUD_MAX_CANVAS 修改
+MIN_CANVAS_SIDE = 100
+MAX_CANVAS_SIDE = int(os.environ.get('WORDCLOUD_MAX_CANVAS', 4096))
+
+# 布局画布的像素上限：更大的画布（如 4K 海报）在按比例缩小的画布上搜索位置，
+# 绘制时再放大，布局耗时与像素数近似成正比；可通过环境变量 WORDCLOUD_MAX_LAYOUT_PIXELS 修改，0 表示不限制
+MAX_LAYOUT_PIXELS = int(os.environ.get('WORDCLOUD_MAX_LAYOUT_PIXELS', 1_000_000))
+
+
+def preview_params(params):
+    """预览渲染参数：在一半尺寸的画布上布局较少的词语，字号搜索步长更粗，
+    再放大2倍显示，得到与正式渲染相同尺寸的图像"""
+    return {
+        **params,
+        'width': params['width'] // 2,
+        'height': params['height'] // 2,
+        'scale': params.get('scale', 1) * 2,
+        'max_words': min(30, params.get('max_words', 200)),
+        'font_step': 4,
+        'min_font_size': max(1, params['min_font_size'] // 2),
+        'max_font_size': params['max_font_size'] // 2
+    }
+
+
+# 保存图片时相对显示尺寸的放大倍数，只有保存时才绘制全分辨率图像
+SAVE_SCALE = int(os.environ.get('WORDCLOUD_SAVE_SCALE', 2))
+
+
+def save_scale(params):
+    """保存图片的放大倍数：最多 SAVE_SCALE 倍，放大后的宽高不超过 MAX_CANVAS_SIDE
+
+    已达到上限的大画布按显示尺寸保存，不再放大。
+    """
+    side = max(params['width'], params['height']) * params.get('scale', 1)
+    return max(1, min(SAVE_SCALE, MAX_CANVAS_SIDE / side))
+
+# 输出格式：名称 -> (MIME类型, 文件扩展名, 说明)
+OUTPUT_FORMATS = {
+    'png': ('image/png', 'png', "PNG 真彩色"),
+    'png8': ('image/png', 'png', "调色板 PNG，量化为不超过256色"),
+    'webp': ('image/webp', 'webp', "无损 WebP"),
+    'svg': ('image/svg+xml', 'svg', "SVG 矢量图，由布局直接生成，查看时需安装相同字体")
+}
+
+# 编码预设：fast 编码耗时最少，small 输出字节最少
+OUTPUT_PRESETS = ('fast', 'small')
+
+# 默认编码预设，可通过环境变量 WORDCLOUD_OUTPUT_PRESET 修改
+DEFAULT_PRESET = os.environ.get('WORDCLOUD_OUTPUT_PRESET', 'fast')
+
+# 各格式在两种预设下的编码参数（600x400 的词云实测：调色板 PNG 约为真彩色的
+# 1/3，small 预设再小约 1/3；无损 WebP 约为真彩色 PNG 的 55%-65%）
+_ENCODER_OPTIONS = {
+    'png': {
+        'fast': {'compress_level': 1},
+        'small': {'optimize': True}
+    },
+    'png8': {
+        'fast': {'colors': 256, 'compress_level': 1},
+        'small': {'colors': 64, 'optimize': True}
+    },
+    'webp': {
+        'fast': {'lossless': True, 'method': 2, 'quality': 25},
+        'small': {'lossless': True, 'method': 4, 'quality': 100}
+    }
+}
+
+
+# 对比词云中两组词语的颜色：目标文档偏好的词、其余文档偏好的词
+CONTRAST_COLORS = ('#d9534f', '#337ab7')
+
+# 并排词云最多显示的文档数
+MAX_PANELS = 12
+
+# 保留的 WordCloud 实例（渲染参数组合）数量上限
+MAX_ENGINES = 32
+
+
+@lru_cache(maxsize=1024)
+def _truetype(font_path, size):
+    """加载并缓存指定字号的字体"""
+    return ImageFont.truetype(font_path, size)
+
+
+@lru_cache(maxsize=2048)
+def _transposed_font(font, orientation=None):
+    """缓存旋转后的字体对象，使其可作为文字尺寸缓存的键"""
+    return ImageFont.TransposedFont(font, orientation=orientation)
+
+
+# 只用于测量文字尺寸的画布，模式与 wordcloud 布局时使用的灰度图一致
+_measure_draw = ImageDraw.Draw(Image.new('L', (1, 1)))
+
+
+@lru_cache(maxsize=65536)
+def _text_extent(word, font, anchor):
+    """测量并缓存文字在 (0, 0) 处的包围盒"""
+    return _measure_draw.textbbox((0, 0), word, font=font, anchor=anchor)
+
+
+class _CachedImageFont:
+    """替换 wordcloud 模块中的 ImageFont，返回缓存的字体对象"""
+    truetype = staticmethod(_truetype)
+    TransposedFont = staticmethod(_transposed_font)
+
+
+class _MeasuringDraw:
+    """包装 ImageDraw.Draw：从原点测量文字尺寸时使用缓存，其余操作直接转发"""
+
+    def __init__(self, draw):
+        self._draw = draw
+
+    def textbbox(self, xy, text, font=None, anchor=None, **kwargs):
+        if tuple(xy) == (0, 0) and not kwargs:
+            return _text_extent(text, font, anchor)
+        return self._draw.textbbox(xy, text, font=font, anchor=anchor, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._draw, name)
+
+
+class _CachedImageDraw:
+    """替换 wordcloud 模块中的 ImageDraw"""
+
+    @staticmethod
+    def Draw(im, mode=None):
+        return _MeasuringDraw(ImageDraw.Draw(im, mode))
+
+
+class _CachedOccupancyMap(wordcloud_module.IntegralOccupancyMap):
+    """替换 wordcloud 模块中的 IntegralOccupancyMap：遮罩已预处理时复制缓存的初始积分图"""
+
+    def __init__(self, height, width, mask):
+        prepared = lookup_mask(mask) if mask is not None else None
+        if prepared is None:
+            super().__init__(height, width, mask)
+            return
+        self.height = height
+        self.width = width
+        self.integral = prepared.integral.copy()
+
+
+class _MaskedWordCloud(WordCloud):
+    """遮罩已预处理时直接返回缓存的布尔遮罩，使积分图缓存可以按数组找到"""
+
+    def _get_bolean_mask(self, mask):
+        prepared = lookup_mask(mask)
+        if prepared is not None:
+            return prepared.boolean
+        return super()._get_bolean_mask(mask)
+
+
+wordcloud_module.ImageFont = _CachedImageFont
+wordcloud_module.ImageDraw = _CachedImageDraw
+wordcloud_module.IntegralOccupancyMap = _CachedOccupancyMap
+
+# 每组渲染参数对应一个 WordCloud 实例及其锁
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+def _mask_array(params):
+    """返回渲染参数中遮罩（按画布尺寸缓存）的数组，没有遮罩时返回 None"""
+    if params.get('mask') is None:
+        return None
+    return prepare_mask(params['mask'], params['width'], params['height']).mask
+
+
+def _create_wordcloud(params):
+    """按渲染参数创建 WordCloud，遮罩路径替换为缓存的遮罩数组"""
+    return _MaskedWordCloud(**{**params, 'mask': _mask_array(params)})
+
+
+def _get_engine(params):
+    """获取（必要时创建）该组渲染参数对应的 WordCloud 实例"""
+    key = tuple(sorted(params.items()))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = (_create_wordcloud(params), threading.Lock())
+            _engines[key] = engine
+            while len(_engines) > MAX_ENGINES:
+                _engines.popitem(last=False)
+        else:
+            _engines.move_to_end(key)
+        return engine
+
+
+def fit_canvas(params, max_pixels=MAX_LAYOUT_PIXELS):
+    """画布超过像素上限时改为在缩小的画布上布局，绘制时按相同倍数放大
+
+    画布与字号按整数倍缩小、scale 相应放大，输出尺寸不变（宽高不能整除时
+    最多少几个像素）。
+    """
+    pixels = params['width'] * params['height']
+    if not max_pixels or pixels <= max_pixels:
+        return params
+    factor = math.ceil(math.sqrt(pixels / max_pixels))
+    return {
+        **params,
+        'width': params['width'] // factor,
+        'height': params['height'] // factor,
+        'scale': params.get('scale', 1) * factor,
+        'min_font_size': max(1, params['min_font_size'] // factor),
+        'max_font_size': max(1, params['max_font_size'] // factor)
+    }
+
+
+def render_params(max_layout_pixels=MAX_LAYOUT_PIXELS, **overrides):
+    """在默认渲染参数基础上覆盖部分参数（值为 None 的参数忽略）
+
+    遮罩 mask 为图片路径；超大画布按 max_layout_pixels 缩小后布局。
+    """
+    params = dict(RENDER_PARAMS)
+    params.update((key, value) for key, value in overrides.items() if value is not None)
+    if params.get('mask') is not None:
+        params['mask'] = os.path.abspath(params['mask'])
+    return fit_canvas(params, max_layout_pixels)
+
+
+def canvas_params(width=None, height=None, mask=None):
+    """指定画布尺寸与遮罩的渲染参数，默认字号按画布相对默认尺寸的比例缩放"""
+    try:
+        width = int(width or RENDER_PARAMS['width'])
+        height = int(height or RENDER_PARAMS['height'])
+    except (TypeError, ValueError):
+        raise ValueError("画布宽度和高度必须是整数") from None
+    if not (MIN_CANVAS_SIDE <= width <= MAX_CANVAS_SIDE and
+            MIN_CANVAS_SIDE <= height <= MAX_CANVAS_SIDE):
+        raise ValueError(f"画布宽度和高度应在 {MIN_CANVAS_SIDE}-{MAX_CANVAS_SIDE} 像素之间")
+    ratio = min(width / RENDER_PARAMS['width'], height / RENDER_PARAMS['height'])
+    return render_params(
+        width=width,
+        height=height,
+        mask=mask,
+        min_font_size=max(4, round(RENDER_PARAMS['min_font_size'] * ratio)),
+        max_font_size=max(8, round(RENDER_PARAMS['max_font_size'] * ratio))
+    )
+
+
+def render_wordcloud(word_freq, params=RENDER_PARAMS):
+    """根据词频生成词云
+
+    复用该组参数的 WordCloud 实例完成布局，返回持有本次布局结果的浅拷贝，
+    调用方可在锁外安全地调用 to_image 等方法。WordCloud 会对传入的整个词频表
+    排序后只取前 max_words 个，这里先用堆选出这些词，避免对庞大词表完整排序。
+    """
+    word_freq = dict(top_words(word_freq, params.get('max_words', 200)))
+    wordcloud, lock = _get_engine(params)
+    with lock:
+        # 固定随机种子时每次渲染都从同一状态开始，与新建实例的结果一致
+        seed = params.get('random_state')
+        if isinstance(seed, int):
+            wordcloud.random_state = Random(seed)
+        # 每次取缓存的遮罩数组，遮罩缓存被淘汰后重新预处理一次
+        wordcloud.mask = _mask_array(params)
+        wordcloud.generate_from_frequencies(word_freq)
+        return copy.copy(wordcloud)
+
+
+def from_layout(layout, params=RENDER_PARAMS, scale=1):
+    """由已有布局构造可绘制或导出的 WordCloud，不重新布局
+
+    scale 是相对于该组参数原有输出尺寸的放大倍数，用于保存全分辨率图像。
+    """
+    wordcloud = _create_wordcloud(params)
+    wordcloud.layout_ = layout
+    wordcloud.scale = params.get('scale', 1) * scale
+    return wordcloud
+
+
+def render_side_by_side(frequency_lists, params=RENDER_PARAMS):
+    """多组词频各自布局后按网格合并为一个布局，返回 (布局, 合并后的渲染参数)
+
+    每组占一个与 params 相同大小的格子，合并后的布局可与普通词云一样绘制、
+    编码或导出SVG。遮罩不适用于并排词云，会被忽略。最多 MAX_PANELS 组。
+    """
+    if len(frequency_lists) > MAX_PANELS:
+        raise ValueError(f"并排词云最多 {MAX_PANELS} 组")
+    panels = [word_freq for word_freq in frequency_lists if word_freq]
+    if not panels:
+        raise ValueError("没有可用于生成词云的词语")
+    params = {key: value for key, value in params.items() if key != 'mask'}
+    columns = math.ceil(math.sqrt(len(panels)))
+    rows = math.ceil(len(panels) / columns)
+
+    layout = []
+    for index, word_freq in enumerate(panels):
+        # 布局中的位置为 (行, 列) 坐标，按所在格子平移
+        offset_y = index // columns * params['height']
+        offset_x = index % columns * params['width']
+        for word, font_size, (y, x), orientation, color in render_wordcloud(word_freq, params).layout_:
+            layout.append((word, font_size, (y + offset_y, x + offset_x), orientation, color))
+    return layout, {**params, 'width': params['width'] * columns, 'height': params['height'] * rows}
+
+
+def render_contrast(positive, negative, params=RENDER_PARAMS, colors=CONTRAST_COLORS):
+    """对比词云：两组词语（得分为正数）共同布局，分别用两种颜色绘制，返回 WordCloud"""
+    word_freq = {**negative, **positive}
+    if not word_freq:
+        raise ValueError("没有可用于生成词云的词语")
+    wordcloud = render_wordcloud(word_freq, params)
+    wordcloud.layout_ = [
+        (item, font_size, position, orientation, colors[0] if item[0] in positive else colors[1])
+        for item, font_size, position, orientation, _ in wordcloud.layout_
+    ]
+    return wordcloud
+
+
+def encode_png(image):
+    """把PIL图像编码为PNG字节"""
+    img_buffer = io.BytesIO()
+    image.save(img_buffer, format='PNG')
+    return img_buffer.getvalue()
+
+
+def check_output(output_format=None, preset=None):
+    """校验输出格式与编码预设，返回 (格式, 预设)，未指定时为 PNG 与默认预设"""
+    output_format = (output_format or 'png').lower()
+    preset = (preset or DEFAULT_PRESET).lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"未知的输出格式：{output_format}（可选：{'、'.join(OUTPUT_FORMATS)}）")
+    if preset not in OUTPUT_PRESETS:
+        raise ValueError(f"未知的编码预设：{preset}（可选：{'、'.join(OUTPUT_PRESETS)}）")
+    return output_format, preset
+
+
+def format_for_path(path, default='png'):
+    """按文件扩展名推断输出格式，无法识别时返回 default"""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    for output_format, (_, format_extension, _) in OUTPUT_FORMATS.items():
+        if extension == format_extension and output_format != 'png8':
+            return output_format
+    return default
+
+
+def encode_wordcloud(wordcloud, output_format='png', preset=DEFAULT_PRESET, image=None):
+    """按输出格式与编码预设编码已完成布局的词云，返回字节
+
+    image 为已绘制的图像，传入时不再重复绘制；SVG 由布局直接生成，不绘制图像，
+    small 预设去掉元素之间的换行。
+    """
+    output_format, preset = check_output(output_format, preset)
+    if output_format == 'svg':
+        svg = wordcloud.to_svg()
+        if preset == 'small':
+            svg = svg.replace('\n', '')
+        return svg.encode('utf-8')
+
+    if image is None:
+        image = wordcloud.to_image()
+    options = dict(_ENCODER_OPTIONS[output_format][preset])
+    if output_format == 'png8':
+        # 快速八叉树量化：词云颜色少，抗锯齿边缘的过渡色合并后肉眼几乎无差别
+        image = image.quantize(options.pop('colors'), method=Image.Quantize.FASTOCTREE)
+    buffer = io.BytesIO()
+    image.save(buffer, format='WEBP' if output_format == 'webp' else 'PNG', **options)
+    return buffer.getvalue()
+
+
+def top_words(word_freq, n=10):
+    """返回前 n 个高频词及其次数
+
+    使用堆选出前 n 项，代价为 O(V log n)；次数相同的词保持原有顺序，
+    结果与完整排序后取前 n 项一致。
+    """
+    return heapq.nlargest(n, word_freq.items(), key=itemgetter(1))